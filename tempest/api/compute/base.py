@@ -19,8 +19,10 @@ import time
 
 from tempest.api import compute
 from tempest import clients
+from tempest.common import batch
 from tempest.common.utils.data_utils import parse_image_id
 from tempest.common.utils.data_utils import rand_name
+from tempest import exceptions
 from tempest.openstack.common import log as logging
 import tempest.test
 
@@ -82,32 +84,34 @@ class BaseComputeTest(tempest.test.BaseTestCase):
 
     @classmethod
     def clear_servers(cls):
-        for server in cls.servers:
-            try:
-                cls.servers_client.delete_server(server['id'])
-            except Exception:
-                pass
-
-        for server in cls.servers:
-            try:
-                cls.servers_client.wait_for_server_termination(server['id'])
-            except Exception:
-                pass
+        server_ids = [server['id'] for server in cls.servers]
+        cls.servers_client.batch(cls.servers_client.delete_server,
+                                 server_ids)
+        try:
+            cls.servers_client.wait_for_servers_termination(
+                server_ids, ignore_error=True)
+        except exceptions.TimeoutException as exc:
+            LOG.warning('Clearing servers left some behind: %s', exc)
+        except Exception:
+            LOG.exception('Waiting for servers %s to be deleted failed',
+                          ', '.join(server_ids))
 
     @classmethod
     def clear_images(cls):
-        for image_id in cls.images:
-            try:
-                cls.images_client.delete_image(image_id)
-            except Exception as exc:
-                LOG.info('Exception raised deleting image %s', image_id)
-                LOG.exception(exc)
-                pass
+        results = cls.images_client.batch(cls.images_client.delete_image,
+                                          cls.images)
+        for result in results:
+            if result.error is not None:
+                LOG.info('Exception raised deleting image %s', result.item,
+                         exc_info=result.exc_info)
 
     @classmethod
     def tearDownClass(cls):
-        cls.clear_images()
-        cls.clear_servers()
+        # Images and servers do not depend on each other, clear both at
+        # once.
+        for result in batch.run(lambda clear: clear(),
+                                [cls.clear_images, cls.clear_servers], 2):
+            result.get()
         cls._clear_isolated_creds()
 
     @classmethod
@@ -132,9 +136,13 @@ class BaseComputeTest(tempest.test.BaseTestCase):
         cls.servers.extend(servers)
 
         if 'wait_until' in kwargs:
-            for server in servers:
+            if len(servers) > 1:
+                cls.servers_client.wait_for_servers_status(
+                    [server['id'] for server in servers],
+                    kwargs['wait_until'])
+            else:
                 cls.servers_client.wait_for_server_status(
-                    server['id'], kwargs['wait_until'])
+                    servers[0]['id'], kwargs['wait_until'])
 
         return resp, body
 
@@ -65,10 +65,7 @@ class BaseObjectTest(tempest.test.BaseTestCase):
             object_client = cls.object_client
         for cont in containers:
             try:
-                objlist = container_client.list_all_container_objects(cont)
-                # delete every object in the container
-                for obj in objlist:
-                    object_client.delete_object(cont, obj['name'])
+                object_client.delete_container_objects(cont)
                 container_client.delete_container(cont)
             except exceptions.NotFound:
                 pass
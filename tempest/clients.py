@@ -247,10 +247,33 @@ V3_TOKEN_CLIENT = {
 }
 
 
+class lazy_client(object):
+    """
+    Decorator turning a Manager method into a lazily built client
+    attribute. The client is constructed the first time the attribute is
+    read and then stored on the instance, so later reads are plain
+    attribute lookups.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.__name__ = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, manager, owner=None):
+        if manager is None:
+            return self
+        client = self.factory(manager)
+        manager.__dict__[self.__name__] = client
+        return client
+
+
 class Manager(object):
 
     """
     Top level manager for OpenStack Compute clients
+
+    Clients are only constructed when a test first uses them.
     """
 
     def __init__(self, username=None, password=None, tenant_name=None,
@@ -279,80 +302,195 @@ class Manager(object):
                    {'u': username, 'p': password, 't': tenant_name})
             raise exceptions.InvalidConfiguration(msg)
 
+        if interface not in SERVERS_CLIENTS:
+            msg = "Unsupported interface type `%s'" % interface
+            raise exceptions.InvalidConfiguration(msg)
+        self.interface = interface
+
         self.auth_url = self.config.identity.uri
         self.auth_url_v3 = self.config.identity.uri_v3
 
-        client_args = (self.config, self.username, self.password,
-                       self.auth_url, self.tenant_name)
+        self.client_args = (self.config, self.username, self.password,
+                            self.auth_url, self.tenant_name)
 
         if self.auth_url_v3:
             auth_version = 'v3'
-            client_args_v3_auth = (self.config, self.username,
-                                   self.password, self.auth_url_v3,
-                                   self.tenant_name, auth_version)
+            self.client_args_v3_auth = (self.config, self.username,
+                                        self.password, self.auth_url_v3,
+                                        self.tenant_name, auth_version)
         else:
-            client_args_v3_auth = None
-
-        try:
-            self.servers_client = SERVERS_CLIENTS[interface](*client_args)
-            self.limits_client = LIMITS_CLIENTS[interface](*client_args)
-            if self.config.service_available.glance:
-                self.images_client = IMAGES_CLIENTS[interface](*client_args)
-            self.keypairs_client = KEYPAIRS_CLIENTS[interface](*client_args)
-            self.quotas_client = QUOTAS_CLIENTS[interface](*client_args)
-            self.flavors_client = FLAVORS_CLIENTS[interface](*client_args)
-            ext_cli = EXTENSIONS_CLIENTS[interface](*client_args)
-            self.extensions_client = ext_cli
-            vol_ext_cli = VOLUMES_EXTENSIONS_CLIENTS[interface](*client_args)
-            self.volumes_extensions_client = vol_ext_cli
-            self.floating_ips_client = FLOAT_CLIENTS[interface](*client_args)
-            self.snapshots_client = SNAPSHOTS_CLIENTS[interface](*client_args)
-            self.volumes_client = VOLUMES_CLIENTS[interface](*client_args)
-            self.volume_types_client = \
-                VOLUME_TYPES_CLIENTS[interface](*client_args)
-            self.identity_client = IDENTITY_CLIENT[interface](*client_args)
-            self.identity_v3_client = \
-                IDENTITY_V3_CLIENT[interface](*client_args)
-            self.token_client = TOKEN_CLIENT[interface](self.config)
-            self.security_groups_client = \
-                SECURITY_GROUPS_CLIENT[interface](*client_args)
-            self.interfaces_client = INTERFACES_CLIENT[interface](*client_args)
-            self.endpoints_client = ENDPOINT_CLIENT[interface](*client_args)
-            self.fixed_ips_client = FIXED_IPS_CLIENT[interface](*client_args)
-            self.availability_zone_client = \
-                AVAILABILITY_ZONE_CLIENT[interface](*client_args)
-            self.service_client = SERVICE_CLIENT[interface](*client_args)
-            self.aggregates_client = AGGREGATES_CLIENT[interface](*client_args)
-            self.services_client = SERVICES_CLIENT[interface](*client_args)
-            self.tenant_usages_client = \
-                TENANT_USAGES_CLIENT[interface](*client_args)
-            self.policy_client = POLICY_CLIENT[interface](*client_args)
-            self.hypervisor_client = HYPERVISOR_CLIENT[interface](*client_args)
-            self.token_v3_client = V3_TOKEN_CLIENT[interface](*client_args)
-
-            if client_args_v3_auth:
-                self.servers_client_v3_auth = SERVERS_CLIENTS[interface](
-                    *client_args_v3_auth)
-            else:
-                self.servers_client_v3_auth = None
-
-        except KeyError:
-            msg = "Unsupported interface type `%s'" % interface
-            raise exceptions.InvalidConfiguration(msg)
-        self.network_client = NetworkClient(*client_args)
-        self.hosts_client = HostsClientJSON(*client_args)
-        self.account_client = AccountClient(*client_args)
-        if self.config.service_available.glance:
-            self.image_client = ImageClientJSON(*client_args)
-            self.image_client_v2 = ImageClientV2JSON(*client_args)
-        self.container_client = ContainerClient(*client_args)
-        self.object_client = ObjectClient(*client_args)
-        self.orchestration_client = OrchestrationClient(*client_args)
-        self.ec2api_client = botoclients.APIClientEC2(*client_args)
-        self.s3_client = botoclients.ObjectClientS3(*client_args)
-        self.custom_object_client = ObjectClientCustomizedHeader(*client_args)
-        self.custom_account_client = \
-            AccountClientCustomizedHeader(*client_args)
+            self.client_args_v3_auth = None
+
+    def _require_glance(self):
+        # NOTE: the image clients used to be left unset without glance;
+        # keep hasattr() working by raising AttributeError.
+        if not self.config.service_available.glance:
+            raise AttributeError("Glance is not available")
+
+    @lazy_client
+    def servers_client(self):
+        return SERVERS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def limits_client(self):
+        return LIMITS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def images_client(self):
+        self._require_glance()
+        return IMAGES_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def keypairs_client(self):
+        return KEYPAIRS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def quotas_client(self):
+        return QUOTAS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def flavors_client(self):
+        return FLAVORS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def extensions_client(self):
+        return EXTENSIONS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def volumes_extensions_client(self):
+        return VOLUMES_EXTENSIONS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def floating_ips_client(self):
+        return FLOAT_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def snapshots_client(self):
+        return SNAPSHOTS_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def volumes_client(self):
+        return VOLUMES_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def volume_types_client(self):
+        return VOLUME_TYPES_CLIENTS[self.interface](*self.client_args)
+
+    @lazy_client
+    def identity_client(self):
+        return IDENTITY_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def identity_v3_client(self):
+        return IDENTITY_V3_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def token_client(self):
+        return TOKEN_CLIENT[self.interface](self.config)
+
+    @lazy_client
+    def security_groups_client(self):
+        return SECURITY_GROUPS_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def interfaces_client(self):
+        return INTERFACES_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def endpoints_client(self):
+        return ENDPOINT_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def fixed_ips_client(self):
+        return FIXED_IPS_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def availability_zone_client(self):
+        return AVAILABILITY_ZONE_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def service_client(self):
+        return SERVICE_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def aggregates_client(self):
+        return AGGREGATES_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def services_client(self):
+        return SERVICES_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def tenant_usages_client(self):
+        return TENANT_USAGES_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def policy_client(self):
+        return POLICY_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def hypervisor_client(self):
+        return HYPERVISOR_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def token_v3_client(self):
+        return V3_TOKEN_CLIENT[self.interface](*self.client_args)
+
+    @lazy_client
+    def servers_client_v3_auth(self):
+        if not self.client_args_v3_auth:
+            return None
+        return SERVERS_CLIENTS[self.interface](*self.client_args_v3_auth)
+
+    @lazy_client
+    def network_client(self):
+        return NetworkClient(*self.client_args)
+
+    @lazy_client
+    def hosts_client(self):
+        return HostsClientJSON(*self.client_args)
+
+    @lazy_client
+    def account_client(self):
+        return AccountClient(*self.client_args)
+
+    @lazy_client
+    def image_client(self):
+        self._require_glance()
+        return ImageClientJSON(*self.client_args)
+
+    @lazy_client
+    def image_client_v2(self):
+        self._require_glance()
+        return ImageClientV2JSON(*self.client_args)
+
+    @lazy_client
+    def container_client(self):
+        return ContainerClient(*self.client_args)
+
+    @lazy_client
+    def object_client(self):
+        return ObjectClient(*self.client_args)
+
+    @lazy_client
+    def orchestration_client(self):
+        return OrchestrationClient(*self.client_args)
+
+    @lazy_client
+    def ec2api_client(self):
+        return botoclients.APIClientEC2(*self.client_args)
+
+    @lazy_client
+    def s3_client(self):
+        return botoclients.ObjectClientS3(*self.client_args)
+
+    @lazy_client
+    def custom_object_client(self):
+        return ObjectClientCustomizedHeader(*self.client_args)
+
+    @lazy_client
+    def custom_account_client(self):
+        return AccountClientCustomizedHeader(*self.client_args)
 
 
 class AltManager(Manager):
@@ -363,7 +501,7 @@ class AltManager(Manager):
     """
 
     def __init__(self):
-        conf = config.TempestConfig()
+        conf = config.get_config()
         super(AltManager, self).__init__(conf.identity.alt_username,
                                          conf.identity.alt_password,
                                          conf.identity.alt_tenant_name)
@@ -377,7 +515,7 @@ class AdminManager(Manager):
     """
 
     def __init__(self, interface='json'):
-        conf = config.TempestConfig()
+        conf = config.get_config()
         super(AdminManager, self).__init__(conf.identity.admin_username,
                                            conf.identity.admin_password,
                                            conf.identity.admin_tenant_name,
@@ -392,7 +530,7 @@ class ComputeAdminManager(Manager):
     """
 
     def __init__(self, interface='json'):
-        conf = config.TempestConfig()
+        conf = config.get_config()
         base = super(ComputeAdminManager, self)
         base.__init__(conf.compute_admin.username,
                       conf.compute_admin.password,
@@ -406,7 +544,7 @@ class OrchestrationManager(Manager):
     so that heat templates can create users
     """
     def __init__(self, interface='json'):
-        conf = config.TempestConfig()
+        conf = config.get_config()
         base = super(OrchestrationManager, self)
         base.__init__(conf.identity.admin_username,
                       conf.identity.admin_password,
@@ -0,0 +1,85 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import Queue
+import sys
+import threading
+
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class BatchResult(object):
+    """Outcome of calling the batch function for one item."""
+
+    def __init__(self, item):
+        self.item = item
+        self.value = None
+        self.exc_info = None
+
+    @property
+    def error(self):
+        """The exception raised for the item, or None."""
+        return self.exc_info[1] if self.exc_info else None
+
+    def get(self):
+        """Returns the value, re-raising the item's exception if any."""
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return self.value
+
+
+def run(func, items, max_workers):
+    """
+    Calls func(item) for every item on up to max_workers threads.
+
+    Requests to a single endpoint are additionally limited by the slots
+    of the shared connection pool, so a large batch cannot flood one
+    service. Exceptions are caught per item.
+
+    :returns: a list of BatchResult in the order of items.
+    """
+    results = [BatchResult(item) for item in items]
+    if not results:
+        return results
+    work = Queue.Queue()
+    for result in results:
+        work.put(result)
+
+    def worker():
+        while True:
+            try:
+                result = work.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                result.value = func(result.item)
+            except Exception:
+                result.exc_info = sys.exc_info()
+                LOG.debug("Batch call %s(%r) failed",
+                          getattr(func, '__name__', func), result.item,
+                          exc_info=True)
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, len(results)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
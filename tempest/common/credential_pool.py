@@ -0,0 +1,159 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import json
+import os
+import threading
+
+from tempest.common import batch
+from tempest.openstack.common import lockutils
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+KINDS = ('primary', 'alt', 'admin')
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno != errno.ESRCH
+    return True
+
+
+class CredentialPool(object):
+    """
+    Pool of pre-created tenants and users shared by the test processes.
+
+    Entries are kept in pool_file as a list of dicts with the 'kind' of
+    the credentials, the keystone 'user' and 'tenant', the 'password'
+    and the pid of the process that leased them, if any. The file is
+    only read and written under an external lock next to it. A lease
+    held by a process that no longer runs, such as a killed test worker,
+    is taken over. Credentials are not deleted when released, so later
+    runs using the same file reuse them. Credentials released as not
+    clean are marked 'quarantined' and never leased again, their tenant
+    may still hold resources that would disturb other tests.
+    """
+
+    def __init__(self, pool_file, size=4, workers=1):
+        self.pool_file = pool_file
+        self.size = size
+        self.workers = workers
+
+    def lease(self, kind, create):
+        """
+        Leases free credentials of kind, a member of KINDS. When there
+        are none, create() is called to make a (user, tenant, password)
+        tuple: size times if the pool has none of kind yet, once if all
+        of them are leased.
+
+        :returns: the user and tenant dicts and the password.
+        """
+        with self._file_lock():
+            entries = self._read_file()
+            entry = self._free_entry(entries, kind)
+            if entry is None:
+                known = len([e for e in entries if e['kind'] == kind])
+                count = 1 if known else max(1, self.size)
+                LOG.info("Adding %d %s credentials to the pool in %s",
+                         count, kind, self.pool_file)
+                results = batch.run(lambda _: create(), range(count),
+                                    self.workers)
+                created = [result.value for result in results
+                           if result.error is None]
+                if not created:
+                    results[0].get()
+                for user, tenant, password in created:
+                    entries.append({'kind': kind, 'user': user,
+                                    'tenant': tenant, 'password': password,
+                                    'leased_by': None})
+                entry = entries[-1]
+            entry['leased_by'] = os.getpid()
+            self._write_file(entries)
+        return entry['user'], entry['tenant'], entry['password']
+
+    def release(self, user, clean=True):
+        """
+        Returns the credentials of user, leased before, to the pool, or
+        quarantines them unless their tenant was left clean.
+        """
+        with self._file_lock():
+            entries = self._read_file()
+            for entry in entries:
+                if entry['user']['id'] == user['id']:
+                    entry['leased_by'] = None
+                    if not clean:
+                        LOG.warning("Quarantining user %s of the credential "
+                                    "pool %s, its tenant was not cleaned up",
+                                    user['id'], self.pool_file)
+                        entry['quarantined'] = True
+                    self._write_file(entries)
+                    return
+        LOG.warning("User %s is not in the credential pool %s",
+                    user['id'], self.pool_file)
+
+    @staticmethod
+    def _free_entry(entries, kind):
+        for entry in entries:
+            if entry['kind'] != kind or entry.get('quarantined'):
+                continue
+            pid = entry['leased_by']
+            if pid is None or not _is_alive(pid):
+                return entry
+        return None
+
+    def _file_lock(self):
+        return lockutils.lock('credential-pool', 'tempest-', external=True,
+                              lock_path=os.path.dirname(
+                                  os.path.abspath(self.pool_file)))
+
+    def _read_file(self):
+        try:
+            with open(self.pool_file) as pool_file:
+                return json.load(pool_file)
+        except (IOError, ValueError):
+            return []
+
+    def _write_file(self, entries):
+        tmp_file = '%s.%d' % (self.pool_file, os.getpid())
+        # Passwords are credentials; keep the file private to the user.
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as pool_file:
+            json.dump(entries, pool_file)
+        os.rename(tmp_file, self.pool_file)
+
+
+def get_credential_pool(config):
+    """
+    Returns the process-wide CredentialPool, creating it on first use,
+    or None if no pool file is configured.
+    """
+    global _POOL
+    if not config.identity.credential_pool_file:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = CredentialPool(config.identity.credential_pool_file,
+                                   config.identity.credential_pool_size,
+                                   config.http.batch_workers)
+        return _POOL
@@ -19,11 +19,17 @@ import copy
 import hashlib
 import httplib
 import json
+import logging as orig_logging
+import mmap
+import os
 import posixpath
 import re
 import socket
+import stat
 import StringIO
 import struct
+import threading
+import time
 import urlparse
 
 
@@ -34,6 +40,9 @@ if not hasattr(urlparse, 'parse_qsl'):
 
 import OpenSSL
 
+from tempest.common import http
+from tempest.common import metrics
+from tempest.common import request_log
 from tempest import exceptions as exc
 from tempest.openstack.common import log as logging
 
@@ -42,6 +51,10 @@ USER_AGENT = 'tempest'
 CHUNKSIZE = 1024 * 64  # 64kB
 TOKEN_CHARS_RE = re.compile('^[-A-Za-z0-9+/=]*$')
 
+# SSL settings -> OpenSSL.SSL.Context, see VerifiedHTTPSConnection.
+_SSL_CONTEXTS = {}
+_SSL_CONTEXTS_LOCK = threading.Lock()
+
 
 class HTTPClient(object):
 
@@ -58,6 +71,14 @@ class HTTPClient(object):
             self.endpoint_scheme, **kwargs)
 
         self.auth_token = kwargs.get('token')
+        self.request_log = kwargs.get('request_log')
+        self.metrics = kwargs.get('metrics')
+        self.chunk_size = kwargs.get('chunk_size') or CHUNKSIZE
+        self.connection_pool = (kwargs.get('connection_pool') or
+                                http.ConnectionPool())
+        self.pool_key = ('glance', self.endpoint_scheme,
+                         self.endpoint_hostname, self.endpoint_port,
+                         tuple(sorted(self.connection_kwargs.items())))
 
     @staticmethod
     def parse_endpoint(endpoint):
@@ -105,34 +126,63 @@ class HTTPClient(object):
 
         self._log_request(method, url, kwargs['headers'])
 
-        conn = self.get_connection()
+        checksum = kwargs.pop('checksum', None)
+        timer = metrics.Timer()
+        conn_url = posixpath.normpath('%s/%s' % (self.endpoint_path, url))
+        body = kwargs.get('body')
+        self.connection_pool.acquire(self.pool_key)
+        conn = None
+        # A file or iterator body cannot be sent again should an idle
+        # connection turn out to have been closed by the server.
+        if body is None or isinstance(body, basestring):
+            conn = self.connection_pool.get(self.pool_key)
 
         try:
-            conn_url = posixpath.normpath('%s/%s' % (self.endpoint_path, url))
-            if kwargs['headers'].get('Transfer-Encoding') == 'chunked':
-                conn.putrequest(method, conn_url)
-                for header, value in kwargs['headers'].items():
-                    conn.putheader(header, value)
-                conn.endheaders()
-                chunk = kwargs['body'].read(CHUNKSIZE)
-                # Chunk it, baby...
-                while chunk:
-                    conn.send('%x\r\n%s\r\n' % (len(chunk), chunk))
-                    chunk = kwargs['body'].read(CHUNKSIZE)
-                conn.send('0\r\n\r\n')
-            else:
-                conn.request(method, conn_url, **kwargs)
-            resp = conn.getresponse()
-        except socket.gaierror as e:
-            message = ("Error finding address for %(url)s: %(e)s" %
-                       {'url': url, 'e': e})
-            raise exc.EndpointNotFound(message)
-        except (socket.error, socket.timeout) as e:
-            message = ("Error communicating with %(endpoint)s %(e)s" %
-                       {'endpoint': self.endpoint, 'e': e})
-            raise exc.TimeoutException(message)
-
-        body_iter = ResponseBodyIterator(resp)
+            try:
+                if conn is not None:
+                    try:
+                        resp = self._send(conn, method, conn_url, timer,
+                                          checksum, **kwargs)
+                    except (socket.error, httplib.HTTPException):
+                        # The server may have closed the idle connection;
+                        # send again on a new one.
+                        conn.close()
+                        conn = None
+                if conn is None:
+                    conn = self.get_connection()
+                    self._connect(conn, timer)
+                    resp = self._send(conn, method, conn_url, timer,
+                                      checksum, **kwargs)
+            except socket.gaierror as e:
+                message = ("Error finding address for %(url)s: %(e)s" %
+                           {'url': url, 'e': e})
+                raise exc.EndpointNotFound(message)
+            except (socket.error, socket.timeout) as e:
+                message = ("Error communicating with %(endpoint)s %(e)s" %
+                           {'endpoint': self.endpoint, 'e': e})
+                raise exc.TimeoutException(message)
+        except Exception:
+            if conn is not None:
+                conn.close()
+            self.connection_pool.release(self.pool_key)
+            raise
+
+        timer.stop()
+        full_url = '%s/%s' % (self.endpoint, url.lstrip('/'))
+        if self.metrics is not None:
+            self.metrics.observe('image', method, full_url, resp.status,
+                                 timer)
+        if self.request_log is not None and self.request_log.enabled:
+            length = resp.getheader('content-length', None)
+            self.request_log.record(
+                method, full_url, resp.status, timer.phases['total'],
+                request_log.body_size(kwargs.get('body'),
+                                      kwargs['headers']),
+                int(length) if length else None)
+
+        body_iter = ResponseBodyIterator(
+            resp, lambda complete: self._check_in(conn, complete),
+            self.chunk_size)
 
         # Read body into string if it isn't obviously image data
         if resp.getheader('content-type', None) != 'application/octet-stream':
@@ -144,29 +194,103 @@ class HTTPClient(object):
 
         return resp, body_iter
 
+    def _check_in(self, conn, reusable):
+        """Returns conn to the pool once its response has been read."""
+        if reusable:
+            self.connection_pool.put(self.pool_key, conn)
+        else:
+            conn.close()
+        self.connection_pool.release(self.pool_key)
+
+    def _send(self, conn, method, conn_url, timer, checksum, **kwargs):
+        """
+        Sends the request on conn and returns the response. Data sent
+        from a body is also written to checksum, if given.
+        """
+        body = kwargs.get('body')
+        chunked = kwargs['headers'].get('Transfer-Encoding') == 'chunked'
+        size = None if chunked else get_file_size(body)
+        if chunked or size is not None:
+            conn.putrequest(method, conn_url)
+            for header, value in kwargs['headers'].items():
+                conn.putheader(header, value)
+            conn.endheaders()
+        if chunked:
+            chunk = body.read(self.chunk_size)
+            # Chunk it, baby...
+            while chunk:
+                if checksum is not None:
+                    checksum.write(chunk)
+                conn.send('%x\r\n%s\r\n' % (len(chunk), chunk))
+                chunk = body.read(self.chunk_size)
+            conn.send('0\r\n\r\n')
+        elif size is not None:
+            self._send_file(conn, body, size, checksum)
+        else:
+            if checksum is not None and isinstance(body, basestring):
+                checksum.write(body)
+            conn.request(method, conn_url, **kwargs)
+        sent = time.time()
+        resp = conn.getresponse()
+        timer.set('ttfb', time.time() - sent)
+        return resp
+
+    def _send_file(self, conn, body, size, checksum):
+        # Map the file instead of reading it, the slices handed to the
+        # socket and hashes are views of the page cache, not copies.
+        offset = body.tell()
+        end = offset + size
+        if end == offset:
+            return
+        mapped = mmap.mmap(body.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for start in xrange(offset, end, self.chunk_size):
+                chunk = buffer(mapped, start, min(self.chunk_size,
+                                                  end - start))
+                if checksum is not None:
+                    checksum.write(chunk)
+                conn.send(chunk)
+        finally:
+            mapped.close()
+        body.seek(end)
+
+    @staticmethod
+    def _connect(conn, timer):
+        """Opens conn, timing the TCP connect and TLS handshake apart."""
+        start = time.time()
+        conn.connect()
+        timer.add('connect', time.time() - start)
+        if isinstance(conn.sock, OpenSSLConnectionDelegator):
+            # pyOpenSSL defers the handshake to the first write.
+            start = time.time()
+            conn.sock.do_handshake()
+            timer.add('tls', time.time() - start)
+
     def _log_request(self, method, url, headers):
-        LOG.info('Request: ' + method + ' ' + url)
-        if headers:
+        if LOG.isEnabledFor(orig_logging.INFO):
+            LOG.info('Request: %s %s', method, url)
+        if headers and LOG.isEnabledFor(orig_logging.DEBUG):
             headers_out = headers
             if 'X-Auth-Token' in headers and headers['X-Auth-Token']:
                 token = headers['X-Auth-Token']
                 if len(token) > 64 and TOKEN_CHARS_RE.match(token):
                     headers_out = headers.copy()
                     headers_out['X-Auth-Token'] = "<Token omitted>"
-                LOG.info('Request Headers: ' + str(headers_out))
+            LOG.debug('Request Headers: %s', headers_out)
 
     def _log_response(self, resp, body):
-        status = str(resp.status)
-        LOG.info("Response Status: " + status)
-        if resp.getheaders():
-            LOG.info('Response Headers: ' + str(resp.getheaders()))
-        if body:
-            str_body = str(body)
+        if LOG.isEnabledFor(orig_logging.INFO):
+            LOG.info("Response Status: %s", resp.status)
+        if not LOG.isEnabledFor(orig_logging.DEBUG):
+            return
+        LOG.debug('Response Headers: %s', resp.getheaders())
+        # Image data is streamed to the caller and not logged.
+        if body and isinstance(body, basestring):
             length = len(body)
-            LOG.info('Response Body: ' + str_body[:2048])
+            LOG.debug('Response Body: %s', body[:2048])
             if length >= 2048:
-                self.LOG.debug("Large body (%d) md5 summary: %s", length,
-                               hashlib.md5(str_body).hexdigest())
+                LOG.debug("Large body (%d) md5 summary: %s", length,
+                          hashlib.md5(body).hexdigest())
 
     def json_request(self, method, url, **kwargs):
         kwargs.setdefault('headers', {})
@@ -195,12 +319,68 @@ class HTTPClient(object):
         if 'body' in kwargs:
             if (hasattr(kwargs['body'], 'read')
                     and method.lower() in ('post', 'put')):
-                # We use 'Transfer-Encoding: chunked' because
-                # body size may not always be known in advance.
-                kwargs['headers']['Transfer-Encoding'] = 'chunked'
+                size = get_file_size(kwargs['body'])
+                if size is not None:
+                    # Local files are sent straight from a memory map.
+                    kwargs['headers']['Content-Length'] = str(size)
+                else:
+                    # We use 'Transfer-Encoding: chunked' because
+                    # body size may not always be known in advance.
+                    kwargs['headers']['Transfer-Encoding'] = 'chunked'
         return self._http_request(url, method, **kwargs)
 
 
+def get_file_size(body):
+    """
+    Returns the number of bytes left in body if it is a regular file,
+    otherwise None.
+    """
+    try:
+        info = os.fstat(body.fileno())
+        if not stat.S_ISREG(info.st_mode):
+            return None
+        return info.st_size - body.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
+class ChecksumWriter(object):
+    """
+    File-like sink that hashes and counts the data written to it and
+    passes it on to dest, or discards it if dest is None. md5, the
+    checksum Glance reports, is always computed; algorithms may add
+    others such as sha256.
+    """
+
+    def __init__(self, dest=None, algorithms=()):
+        self.dest = dest
+        self.hashes = dict((name, hashlib.new(name))
+                           for name in set(algorithms) | set(['md5']))
+        self.size = 0
+
+    def write(self, data):
+        for digest in self.hashes.values():
+            digest.update(data)
+        self.size += len(data)
+        if self.dest is not None:
+            self.dest.write(data)
+
+    def hexdigest(self, algorithm='md5'):
+        return self.hashes[algorithm].hexdigest()
+
+    def verify(self, image_id, expected):
+        """
+        Raises ImageChecksumMismatch if expected, the checksum Glance
+        reported for the image, is known and differs from the md5 of
+        the data written.
+        """
+        actual = self.hexdigest()
+        if expected and expected != actual:
+            raise exc.ImageChecksumMismatch(image_id=image_id,
+                                            expected=expected,
+                                            actual=actual)
+
+
 class OpenSSLConnectionDelegator(object):
     """
     An OpenSSL.SSL.Connection delegator.
@@ -271,7 +451,8 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
             msg = msg + ', subjectAltName "%s"' % san_list
         raise exc.SSLCertificateError(msg)
 
-    def verify_callback(self, connection, x509, errnum,
+    @classmethod
+    def verify_callback(cls, connection, x509, errnum,
                         depth, preverify_ok):
         if x509.has_expired():
             msg = "SSL Certificate expired on '%s'" % x509.get_notAfter()
@@ -279,38 +460,48 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
 
         if depth == 0 and preverify_ok is True:
             # We verify that the host matches against the last
-            # certificate in the chain
-            return self.host_matches_cert(self.host, x509)
+            # certificate in the chain. The context is shared between
+            # connections, each of which carries its host as app data.
+            return cls.host_matches_cert(connection.get_app_data(), x509)
         else:
             # Pass through OpenSSL's default result
             return preverify_ok
 
     def setcontext(self):
         """
-        Set up the OpenSSL context.
+        Set up the OpenSSL context, shared by every connection with the
+        same SSL settings so CA and certificate files are loaded once.
         """
-        self.context = OpenSSL.SSL.Context(OpenSSL.SSL.SSLv23_METHOD)
+        key = (self.cacert, self.cert_file, self.key_file, self.insecure,
+               self.ssl_compression)
+        with _SSL_CONTEXTS_LOCK:
+            if key not in _SSL_CONTEXTS:
+                _SSL_CONTEXTS[key] = self._create_context()
+            self.context = _SSL_CONTEXTS[key]
+
+    def _create_context(self):
+        context = OpenSSL.SSL.Context(OpenSSL.SSL.SSLv23_METHOD)
 
         if self.ssl_compression is False:
-            self.context.set_options(0x20000)  # SSL_OP_NO_COMPRESSION
+            context.set_options(0x20000)  # SSL_OP_NO_COMPRESSION
 
         if self.insecure is not True:
-            self.context.set_verify(OpenSSL.SSL.VERIFY_PEER,
-                                    self.verify_callback)
+            context.set_verify(OpenSSL.SSL.VERIFY_PEER,
+                               self.verify_callback)
         else:
-            self.context.set_verify(OpenSSL.SSL.VERIFY_NONE,
-                                    self.verify_callback)
+            context.set_verify(OpenSSL.SSL.VERIFY_NONE,
+                               self.verify_callback)
 
         if self.cert_file:
             try:
-                self.context.use_certificate_file(self.cert_file)
+                context.use_certificate_file(self.cert_file)
             except Exception as e:
                 msg = 'Unable to load cert from "%s" %s' % (self.cert_file, e)
                 raise exc.SSLConfigurationError(msg)
             if self.key_file is None:
                 # We support having key and cert in same file
                 try:
-                    self.context.use_privatekey_file(self.cert_file)
+                    context.use_privatekey_file(self.cert_file)
                 except Exception as e:
                     msg = ('No key file specified and unable to load key '
                            'from "%s" %s' % (self.cert_file, e))
@@ -318,19 +509,20 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
 
         if self.key_file:
             try:
-                self.context.use_privatekey_file(self.key_file)
+                context.use_privatekey_file(self.key_file)
             except Exception as e:
                 msg = 'Unable to load key from "%s" %s' % (self.key_file, e)
                 raise exc.SSLConfigurationError(msg)
 
         if self.cacert:
             try:
-                self.context.load_verify_locations(self.cacert)
+                context.load_verify_locations(self.cacert)
             except Exception as e:
-                msg = 'Unable to load CA from "%s"' % (self.cacert, e)
+                msg = 'Unable to load CA from "%s" %s' % (self.cacert, e)
                 raise exc.SSLConfigurationError(msg)
         else:
-            self.context.set_default_verify_paths()
+            context.set_default_verify_paths()
+        return context
 
     def connect(self):
         """
@@ -343,22 +535,44 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO,
                             struct.pack('LL', self.timeout, 0))
         self.sock = OpenSSLConnectionDelegator(self.context, sock)
+        self.sock.set_app_data(self.host)
         self.sock.connect((self.host, self.port))
 
 
 class ResponseBodyIterator(object):
-    """A class that acts as an iterator over an HTTP response."""
+    """
+    A class that acts as an iterator over an HTTP response.
+
+    on_done(complete) is called once the body was read to the end
+    (complete is True) or the iterator was closed or dropped early.
+    """
 
-    def __init__(self, resp):
+    def __init__(self, resp, on_done=None, chunk_size=CHUNKSIZE):
         self.resp = resp
+        self.on_done = on_done
+        self.chunk_size = chunk_size
 
     def __iter__(self):
         while True:
             yield self.next()
 
+    def _finish(self, complete):
+        on_done, self.on_done = self.on_done, None
+        if on_done is not None:
+            on_done(complete)
+
     def next(self):
-        chunk = self.resp.read(CHUNKSIZE)
+        chunk = self.resp.read(self.chunk_size)
         if chunk:
             return chunk
         else:
+            self._finish(True)
             raise StopIteration()
+
+    def close(self):
+        if self.on_done is not None:
+            self.resp.close()
+            self._finish(False)
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,462 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import hashlib
+import httplib
+import os
+import socket
+import threading
+import time
+
+import httplib2
+
+from tempest import exceptions
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+CHUNK_SIZE = 65536
+
+
+class ConnectionPool(object):
+    """
+    Process-wide pool of idle keep-alive HTTP connections.
+
+    Connections are grouped by a hashable key, typically
+    (scheme, authority, TLS options). At most max_per_host connections
+    per key may be checked out at the same time, waiting for a slot
+    gives up after wait_timeout seconds; idle connections that have not
+    been used for idle_timeout seconds are closed instead of being
+    reused.
+    """
+
+    def __init__(self, max_per_host=10, idle_timeout=60, wait_timeout=300):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._idle = collections.defaultdict(collections.deque)
+        self._slots_freed = threading.Condition(threading.Lock())
+        self._in_use = collections.defaultdict(int)
+
+    def acquire(self, key):
+        """
+        Blocks until a connection slot for key is available, raising
+        TimeoutException if none is within wait_timeout seconds.
+        """
+        deadline = time.time() + self.wait_timeout
+        with self._slots_freed:
+            while self._in_use[key] >= self.max_per_host:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise exceptions.TimeoutException(
+                        "No free connection to %s within %ss" %
+                        (key[0] if isinstance(key, tuple) else key,
+                         self.wait_timeout))
+                self._slots_freed.wait(remaining)
+            self._in_use[key] += 1
+
+    def release(self, key):
+        with self._slots_freed:
+            self._in_use[key] -= 1
+            self._slots_freed.notify()
+
+    def get(self, key):
+        """Returns a live idle connection for key, or None."""
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                conn, last_used = idle.pop()
+                if conn.sock is not None and \
+                        now - last_used < self.idle_timeout:
+                    return conn
+                self._close(conn)
+        return None
+
+    def put(self, key, conn):
+        """Returns a connection to the pool once a request completed."""
+        if conn.sock is None:
+            return
+        now = time.time()
+        with self._lock:
+            idle = self._idle[key]
+            # Evict from the cold end first; the deque is used LIFO so
+            # the oldest connections sit on the left.
+            while idle and now - idle[0][1] >= self.idle_timeout:
+                self._close(idle.popleft()[0])
+            if len(idle) >= self.max_per_host:
+                self._close(conn)
+                return
+            idle.append((conn, now))
+
+    def clear(self):
+        """Closes every idle connection held by the pool."""
+        with self._lock:
+            for idle in self._idle.values():
+                while idle:
+                    self._close(idle.pop()[0])
+            self._idle.clear()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            LOG.debug("Ignoring error while closing pooled connection",
+                      exc_info=True)
+
+
+class HashingReader(object):
+    """
+    File-like wrapper that computes the md5 and length of the data read
+    through it, for logging bodies that are never held in memory.
+    """
+
+    def __init__(self, source):
+        if hasattr(source, 'read'):
+            self._read = source.read
+        else:
+            self._read = self._buffered(iter(source))
+        self.md5 = hashlib.md5()
+        self.length = 0
+
+    @staticmethod
+    def _buffered(chunks):
+        state = {'buffer': ''}
+
+        def read(size=-1):
+            buf = state['buffer']
+            while size < 0 or len(buf) < size:
+                try:
+                    buf += next(chunks)
+                except StopIteration:
+                    break
+            if size < 0:
+                size = len(buf)
+            state['buffer'] = buf[size:]
+            return buf[:size]
+        return read
+
+    def read(self, size=-1):
+        data = self._read(size)
+        self.md5.update(data)
+        self.length += len(data)
+        return data
+
+
+class ChunkedBody(object):
+    """
+    File-like object sending a file or an iterator of strings with the
+    chunked transfer encoding, for request bodies of unknown length.
+    """
+
+    def __init__(self, source):
+        if hasattr(source, 'read'):
+            self._chunks = iter(lambda: source.read(CHUNK_SIZE), '')
+        else:
+            self._chunks = iter(source)
+        self._done = False
+
+    def read(self, size=-1):
+        # httplib sends whatever one read() returns, so frame one chunk
+        # of the source per call and ignore size.
+        if self._done:
+            return ''
+        for chunk in self._chunks:
+            if chunk:
+                return '%x\r\n%s\r\n' % (len(chunk), chunk)
+        self._done = True
+        return '0\r\n\r\n'
+
+
+def prepare_body(headers, body, hashing=False):
+    """
+    Returns the headers and body to send for a request body that may be
+    a string, a file-like object or an iterator of strings. Files with
+    a known size are sent as they are, anything else is sent chunked.
+    With hashing the body is wrapped in a HashingReader, returned as the
+    third value.
+    """
+    if body is None or isinstance(body, basestring):
+        return headers, body, None
+    headers = dict(headers or {})
+    names = set(name.lower() for name in headers)
+    length = None
+    if 'content-length' not in names:
+        try:
+            length = os.fstat(body.fileno()).st_size - body.tell()
+        except (AttributeError, IOError, OSError, ValueError):
+            pass
+    reader = None
+    if hashing:
+        body = reader = HashingReader(body)
+    if length is not None:
+        headers['Content-Length'] = str(length)
+    elif 'content-length' not in names:
+        headers['Transfer-Encoding'] = 'chunked'
+        body = ChunkedBody(body)
+    return headers, body, reader
+
+
+class StreamingBody(object):
+    """
+    Body of a streamed response, read from the socket as it is iterated.
+
+    The connection stays checked out of the pool until the body has been
+    read to the end or closed; callers must do one or the other. When md5
+    is set, it is updated with every chunk read.
+    """
+
+    def __init__(self, response, chunk_size=CHUNK_SIZE):
+        self._response = response
+        self.chunk_size = chunk_size
+        self.md5 = None
+        self.length = 0
+        self.closed = False
+        self._callbacks = []
+
+    def add_done_callback(self, callback):
+        """
+        Registers callback(body, complete), called once the body was
+        read to the end (complete is True) or closed early. Callbacks
+        get the body as an argument and must not keep a reference to it:
+        the cycle through __del__ could never be garbage collected.
+        """
+        if self.closed:
+            callback(self, True)
+        else:
+            self._callbacks.append(callback)
+
+    def _finish(self, complete):
+        if self.closed:
+            return
+        self.closed = True
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self, complete)
+
+    def read(self, size=None):
+        if self.closed:
+            return ''
+        data = self._response.read(size)
+        self.length += len(data)
+        if self.md5 is not None:
+            self.md5.update(data)
+        if size is None or not data or self._response.isclosed():
+            self._finish(True)
+        return data
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        """Drops the rest of the body along with its connection."""
+        if not self.closed:
+            self._response.close()
+            self._finish(False)
+
+    def __del__(self):
+        self.close()
+
+
+class _TimedConnection(object):
+    """
+    Connection proxy recording the connect and time-to-first-byte phases
+    of the requests sent through it in a metrics.Timer.
+    """
+
+    def __init__(self, conn, timer):
+        self._conn = conn
+        self._timer = timer
+        self._sent = None
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def connect(self):
+        start = time.time()
+        try:
+            self._conn.connect()
+        finally:
+            self._timer.add('connect', time.time() - start)
+
+    def request(self, *args, **kwargs):
+        self._sent = time.time()
+        return self._conn.request(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        response = self._conn.getresponse(*args, **kwargs)
+        if self._sent is not None:
+            self._timer.set('ttfb', time.time() - self._sent)
+        return response
+
+
+class PooledHttp(httplib2.Http):
+    """
+    httplib2.Http variant that borrows its connections from a shared
+    ConnectionPool instead of keeping a private set per instance, so
+    every client talking to the same endpoint reuses the same keep-alive
+    sockets.
+    """
+
+    def __init__(self, pool, **kwargs):
+        # httplib2 keeps its connections in self.connections; make that
+        # per-thread so one client object can be used concurrently.
+        self._local = threading.local()
+        super(PooledHttp, self).__init__(**kwargs)
+        self.pool = pool
+
+    @property
+    def connections(self):
+        try:
+            return self._local.connections
+        except AttributeError:
+            self._local.connections = {}
+            return self._local.connections
+
+    @connections.setter
+    def connections(self, value):
+        self._local.connections = value
+
+    def _pool_key(self, conn_key):
+        return (conn_key, self.disable_ssl_certificate_validation,
+                self.ca_certs, self.timeout)
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                redirections=httplib2.DEFAULT_MAX_REDIRECTS,
+                connection_type=None, stream=False, timer=None):
+        """
+        Same as httplib2.Http.request. With stream, a successful
+        response's content is a StreamingBody instead of a string. With
+        timer, a metrics.Timer, the connect and ttfb phases are recorded.
+        """
+        if getattr(self._local, 'in_request', False):
+            # httplib2 follows redirects by calling request() again; the
+            # slot taken by the outer call covers the whole exchange and
+            # the connections it opens are checked in by that call.
+            return super(PooledHttp, self).request(
+                uri, method, body=body, headers=headers,
+                redirections=redirections, connection_type=connection_type)
+        scheme, authority = httplib2.urlnorm(uri)[:2]
+        conn_key = scheme + ":" + authority
+        pool_key = self._pool_key(conn_key)
+        self.pool.acquire(pool_key)
+        # A streamed body cannot be sent again should an idle connection
+        # turn out to have been closed by the server.
+        if body is None or isinstance(body, basestring):
+            conn = self.pool.get(pool_key)
+            if conn is not None:
+                self.connections[conn_key] = conn
+        if stream:
+            headers = dict(headers or {})
+            if 'accept-encoding' not in set(h.lower() for h in headers):
+                # httplib2 would ask for gzip, which it only decodes when
+                # it reads the whole body itself.
+                headers['accept-encoding'] = 'identity'
+        self._local.stream = stream
+        self._local.timer = timer
+        self._local.in_request = True
+        response = None
+        try:
+            response = super(PooledHttp, self).request(
+                uri, method, body=body, headers=headers,
+                redirections=redirections, connection_type=connection_type)
+            return response
+        finally:
+            self._local.stream = False
+            self._local.timer = None
+            self._local.in_request = False
+            # Redirects may have opened connections to other authorities;
+            # hand all of them back, or drop them if the request failed
+            # half way and their state is unknown. A streamed body keeps
+            # its connection until it has been read.
+            connections = self.connections.items()
+            self.connections.clear()
+            if response is not None and \
+                    isinstance(response[1], StreamingBody):
+                response[1].add_done_callback(
+                    lambda body, complete: self._check_in(
+                        connections, pool_key, complete))
+            else:
+                self._check_in(connections, pool_key, response is not None)
+
+    def _check_in(self, connections, pool_key, reusable):
+        for key, conn in connections:
+            if reusable:
+                self.pool.put(self._pool_key(key), conn)
+            else:
+                ConnectionPool._close(conn)
+        self.pool.release(pool_key)
+
+    def _conn_request(self, conn, request_uri, method, body, headers):
+        timer = getattr(self._local, 'timer', None)
+        if timer is not None:
+            conn = _TimedConnection(conn, timer)
+        if not getattr(self._local, 'stream', False):
+            return super(PooledHttp, self)._conn_request(
+                conn, request_uri, method, body, headers)
+        # Streaming variant of httplib2's _conn_request that leaves the
+        # body on the socket. A pooled connection may have been closed
+        # by the server, so retry once on a fresh one when the body can
+        # be sent again.
+        retry = body is None or isinstance(body, basestring)
+        while True:
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                conn.request(method, request_uri, body, headers)
+                response = conn.getresponse()
+                break
+            except (socket.error, httplib.HTTPException):
+                conn.close()
+                if not retry:
+                    raise
+                retry = False
+        if response.status >= 300 or response.status in (204, 205) or \
+                method == 'HEAD' or response.length == 0:
+            # Redirects are followed and errors checked by reading the
+            # body, these and empty bodies are small.
+            content = response.read()
+            return httplib2.Response(response), content
+        return httplib2.Response(response), StreamingBody(response)
+
+
+def get_connection_pool(config):
+    """Returns the process-wide ConnectionPool, creating it on first use."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ConnectionPool(config.http.max_connections_per_host,
+                                   config.http.connection_idle_timeout,
+                                   config.http.connection_wait_timeout)
+        return _POOL
+
+
+def get_http(config):
+    """Returns an httplib2.Http compatible object backed by the pool."""
+    dscv = config.identity.disable_ssl_certificate_validation
+    return PooledHttp(get_connection_pool(config),
+                      disable_ssl_certificate_validation=dscv)
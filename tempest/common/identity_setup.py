@@ -0,0 +1,98 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from tempest.common.utils.data_utils import unique_name
+from tempest import exceptions
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Role name to id maps of each identity endpoint, by auth_url.
+_ROLE_IDS = {}
+_ROLE_IDS_LOCK = threading.Lock()
+
+# Keystone limits tenant names to 64 characters, leave room for the
+# suffixes added to the name given to create_creds.
+MAX_NAME_ROOT = 32
+
+PASSWORD = "pass"
+
+
+def get_role_id(admin_client, role_name, refresh=False):
+    """
+    Returns the id of the role named role_name. Roles are listed once
+    per identity endpoint and process, or again with refresh.
+    """
+    with _ROLE_IDS_LOCK:
+        role_ids = _ROLE_IDS.get(admin_client.auth_url)
+        if role_ids is None or refresh:
+            _, roles = admin_client.list_roles()
+            role_ids = dict((role['name'], role['id']) for role in roles)
+            _ROLE_IDS[admin_client.auth_url] = role_ids
+    try:
+        return role_ids[role_name]
+    except KeyError:
+        raise exceptions.NotFound("No %s role found" % role_name)
+
+
+def _assign_role(admin_client, tenant, user, role_name):
+    role_id = get_role_id(admin_client, role_name)
+    try:
+        admin_client.assign_user_role(tenant['id'], user['id'], role_id)
+    except exceptions.NotFound:
+        # The cached role may have been deleted and created again.
+        role_id = get_role_id(admin_client, role_name, refresh=True)
+        admin_client.assign_user_role(tenant['id'], user['id'], role_id)
+
+
+def create_creds(admin_client, name, kind='primary', allow_reuse=False):
+    """
+    Creates a tenant and a user in it, with the admin role if kind is
+    'admin'. Names are unique, so there is nothing to retry; if one
+    exists all the same, it is reused with allow_reuse or the Duplicate
+    error raised.
+
+    :returns: the user and tenant dicts and the password.
+    """
+    name_root = unique_name(name[:MAX_NAME_ROOT])
+    if kind != 'primary':
+        name_root += '-' + kind
+    tenant_name = name_root + "-tenant"
+    try:
+        _, tenant = admin_client.create_tenant(
+            name=tenant_name, description=tenant_name + "-desc")
+    except exceptions.Duplicate:
+        if not allow_reuse:
+            raise
+        tenant = admin_client.get_tenant_by_name(tenant_name)
+        LOG.info('Re-using existing tenant %s', tenant)
+
+    username = name_root + "-user"
+    try:
+        _, user = admin_client.create_user(username, PASSWORD, tenant['id'],
+                                           name_root + "@example.com")
+    except exceptions.Duplicate:
+        if not allow_reuse:
+            raise
+        user = admin_client.get_user_by_username(tenant['id'], username)
+        LOG.info('Re-using existing user %s', user)
+
+    if kind == 'admin':
+        _assign_role(admin_client, tenant, user, 'admin')
+    return user, tenant, PASSWORD
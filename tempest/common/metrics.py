@@ -0,0 +1,273 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import atexit
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import urlparse
+
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+_METRICS = None
+_METRICS_LOCK = threading.Lock()
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+           30.0, 60.0)
+
+# connect covers name resolution, the TCP connect and, where the
+# connection does the handshake itself, TLS. ttfb runs from sending the
+# request to receiving the response headers, total covers the whole call.
+PHASES = ('connect', 'tls', 'ttfb', 'total')
+
+_ID_RE = re.compile(r'^(?:[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?'
+                    r'[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}|[0-9a-fA-F]{16,}|'
+                    r'\d+)$')
+# Names made by data_utils.rand_name end in a random number.
+_NAME_RE = re.compile(r'^.+-\d{3,}$')
+
+
+def url_template(url):
+    """
+    Reduces url to its path with ids and generated names replaced by
+    placeholders and query values dropped, so requests for different
+    resources of one kind share a template.
+    """
+    parts = urlparse.urlsplit(url)
+    segments = []
+    for segment in parts.path.split('/'):
+        if _ID_RE.match(segment):
+            segment = '{id}'
+        elif _NAME_RE.match(segment):
+            segment = '{name}'
+        segments.append(segment)
+    template = '/'.join(segments)
+    if parts.query:
+        keys = sorted(set(key for key, _ in
+                          urlparse.parse_qsl(parts.query, True)))
+        template += '?' + '&'.join(keys)
+    return template
+
+
+class Timer(object):
+    """Collects the duration of each phase of one request."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def set(self, phase, seconds):
+        self.phases[phase] = seconds
+
+    def stop(self):
+        self.phases['total'] = time.time() - self.start
+
+
+class Histogram(object):
+    """Latency histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds the observations of other, with the same buckets."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or
+                                      other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or
+                                      other.max > self.max):
+            self.max = other.max
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q quantile,
+        capped by the largest value observed, or None if empty.
+        """
+        if not self.count:
+            return None
+        for bound, count in self.cumulative():
+            if count >= q * self.count:
+                return min(bound, self.max)
+
+    def cumulative(self):
+        """Returns (upper bound, count of values <= bound) pairs."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),),
+                                self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'buckets': [[str(bound), count]
+                        for bound, count in self.cumulative()],
+        }
+
+
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+class Metrics(object):
+    """
+    In-process latency histograms of HTTP requests.
+
+    Requests are grouped by service type, method, url_template and
+    status, with one histogram per phase. A disabled instance drops
+    every observation.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, service, method, url, status, timer):
+        if not self.enabled:
+            return
+        key = (service or 'unknown', method, url_template(url), int(status))
+        with self._lock:
+            histograms = self._series.setdefault(key, {})
+            for phase, seconds in timer.phases.items():
+                if phase not in histograms:
+                    histograms[phase] = Histogram()
+                histograms[phase].observe(seconds)
+
+    def counters(self):
+        """Returns {(key, phase): (count, sum)} for every series."""
+        with self._lock:
+            return dict(((key, phase), (h.count, h.sum))
+                        for key, histograms in self._series.items()
+                        for phase, h in histograms.items())
+
+    def since(self, counters):
+        """
+        Returns the count and total seconds of the requests observed
+        since counters was taken, as a list of dicts.
+        """
+        result = []
+        for (key, phase), (count, total) in sorted(self.counters().items()):
+            old_count, old_total = counters.get((key, phase), (0, 0.0))
+            if count == old_count:
+                continue
+            service, method, url, status = key
+            result.append({'service': service, 'method': method, 'url': url,
+                           'status': status, 'phase': phase,
+                           'count': count - old_count,
+                           'sum': round(total - old_total, 6)})
+        return result
+
+    def to_json(self):
+        with self._lock:
+            series = []
+            for key, histograms in sorted(self._series.items()):
+                service, method, url, status = key
+                for phase, histogram in sorted(histograms.items()):
+                    entry = histogram.to_dict()
+                    entry.update({'service': service, 'method': method,
+                                  'url': url, 'status': status,
+                                  'phase': phase})
+                    series.append(entry)
+        return json.dumps(series, indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        name = 'tempest_http_request_seconds'
+        lines = ['# HELP %s Latency of HTTP requests made by tempest.' % name,
+                 '# TYPE %s histogram' % name]
+        with self._lock:
+            for key, histograms in sorted(self._series.items()):
+                service, method, url, status = key
+                for phase, histogram in sorted(histograms.items()):
+                    labels = ('service="%s",method="%s",url="%s",status="%s",'
+                              'phase="%s"' % tuple(_label(v) for v in (
+                                  service, method, url, status, phase)))
+                    for bound, count in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else str(bound)
+                        lines.append('%s_bucket{%s,le="%s"} %d' %
+                                     (name, labels, le, count))
+                    lines.append('%s_sum{%s} %f' % (name, labels,
+                                                    histogram.sum))
+                    lines.append('%s_count{%s} %d' % (name, labels,
+                                                      histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path, fmt='json'):
+        """
+        Writes the histograms to path as 'json' or 'prometheus' text.
+        %(pid)s in path is replaced by the process id.
+        """
+        path = path % {'pid': os.getpid()}
+        data = self.to_prometheus() if fmt == 'prometheus' else self.to_json()
+        try:
+            with open(path, 'w') as f:
+                f.write(data)
+        except IOError:
+            LOG.exception("Failed to write request metrics to %s", path)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def get_metrics(config):
+    """
+    Returns the process-wide Metrics, creating it on first use. It is
+    enabled, and exported at exit, if a metrics file is configured.
+    """
+    global _METRICS
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            path = config.http.metrics_file
+            _METRICS = Metrics(enabled=bool(path))
+            if path:
+                atexit.register(_METRICS.export, path,
+                                config.http.metrics_format)
+        return _METRICS
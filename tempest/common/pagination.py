@@ -0,0 +1,74 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+import threading
+
+from tempest.common import batch
+
+
+def _fetch_in_background(list_page, marker):
+    result = batch.BatchResult(marker)
+
+    def fetch():
+        try:
+            result.value = list_page(marker)
+        except Exception:
+            result.exc_info = sys.exc_info()
+
+    thread = threading.Thread(target=fetch)
+    thread.daemon = True
+    thread.start()
+    return thread, result
+
+
+def iter_pages(list_page, next_marker, marker=None, limit=None,
+               prefetch=False):
+    """
+    Yields the pages of a marker paginated listing.
+
+    list_page(marker) returns the page of items following marker, and
+    next_marker(page) the marker of the page after it. The listing ends
+    with an empty page or, if the page size limit is known, a short one.
+    With prefetch the next page is requested on a background thread
+    while the caller works on the current one. Only one page is held at
+    a time, whatever the length of the listing.
+    """
+    def last(page):
+        return not page or (limit is not None and len(page) < limit)
+
+    if not prefetch:
+        while True:
+            page = list_page(marker)
+            if page:
+                yield page
+            if last(page):
+                return
+            marker = next_marker(page)
+
+    pending = _fetch_in_background(list_page, marker)
+    while True:
+        thread, result = pending
+        thread.join()
+        page = result.get()
+        done = last(page)
+        if not done:
+            pending = _fetch_in_background(list_page, next_marker(page))
+        if page:
+            yield page
+        if done:
+            return
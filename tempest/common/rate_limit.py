@@ -0,0 +1,168 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import re
+import threading
+import time
+
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+_LIMITER = None
+_LIMITER_LOCK = threading.Lock()
+
+UNIT_SECONDS = {'SECOND': 1, 'MINUTE': 60, 'HOUR': 3600, 'DAY': 86400}
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled at rate tokens per second up to capacity.
+
+    reserve() always takes a token, letting the count go negative; the
+    caller then waits until its token would have been refilled. Excess
+    requests are thereby queued in arrival order instead of being sent
+    in a burst. A bucket without a rate never makes callers wait, except
+    while it is paused.
+    """
+
+    def __init__(self, rate=None, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.time()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def reserve(self):
+        """Takes a token and returns the seconds to wait before using it."""
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+            delay = max(0, self._paused_until - now)
+            if self.rate:
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.rate)
+            return delay
+
+    def set_rate(self, rate, capacity):
+        with self._lock:
+            self._refill(time.time())
+            self.rate = rate
+            self.capacity = max(1, capacity)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def pause(self, seconds):
+        """Hands out no tokens for the next seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+
+class RateLimiter(object):
+    """
+    Paces requests to each endpoint to stay within its rate limits.
+
+    Limits are kept per endpoint as rules in the format of the Nova
+    limits API: an HTTP verb, a regular expression matched against the
+    request path and a token bucket. A request has to get a token from
+    every rule it matches. Rules are learned from limits responses and,
+    for endpoints that do not publish them, from the retry-after of
+    rate limited responses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = {}
+
+    def _matching(self, endpoint, method, url):
+        with self._lock:
+            rules = self._rules.get(endpoint)
+            if not rules:
+                return []
+            rules = rules.items()
+        path = '/' + url.lstrip('/')
+        return [bucket for (verb, pattern), (regex, bucket) in rules
+                if verb == method and regex.search(path)]
+
+    def wait(self, endpoint, method, url):
+        """Blocks until a request may be sent to endpoint."""
+        buckets = self._matching(endpoint, method.upper(), url)
+        delay = max([bucket.reserve() for bucket in buckets] or [0])
+        if delay > 0:
+            LOG.debug("Delaying %s %s by %.2fs to respect rate limits",
+                      method, url, delay)
+            time.sleep(delay)
+
+    def rate_limited(self, endpoint, method, url, retry_after):
+        """
+        Records that a request was refused with the given retry-after.
+        The matching rules, and a catch-all rule for the verb that only
+        ever pauses, hand out no tokens for that long; the rates of the
+        rules are left as they are.
+        """
+        method = method.upper()
+        with self._lock:
+            rules = self._rules.setdefault(endpoint, {})
+            rules.setdefault((method, '.*'), (re.compile('.*'), TokenBucket()))
+        for matched in self._matching(endpoint, method, url):
+            matched.pause(retry_after)
+
+    def learn_limits(self, endpoint, rate_limits):
+        """
+        Replaces the rules of endpoint with the 'rate' section of a
+        limits response.
+        """
+        with self._lock:
+            known = self._rules.get(endpoint, {})
+        rules = {}
+        for rate_limit in rate_limits:
+            pattern = rate_limit.get('regex') or '.*'
+            regex = re.compile(pattern)
+            for limit in rate_limit.get('limit', []):
+                value = int(limit['value'])
+                seconds = UNIT_SECONDS.get(limit['unit'].upper())
+                if not value or not seconds:
+                    continue
+                key = (limit['verb'].upper(), pattern)
+                # Keep the state of buckets we already have, a fresh
+                # bucket would allow a full burst again.
+                if key in known:
+                    bucket = known[key][1]
+                    bucket.set_rate(float(value) / seconds, value)
+                else:
+                    bucket = TokenBucket(float(value) / seconds, value)
+                rules[key] = (regex, bucket)
+        with self._lock:
+            self._rules[endpoint] = rules
+        LOG.debug("Learned %d rate limit rule(s) for %s", len(rules),
+                  endpoint)
+
+
+def get_rate_limiter():
+    """Returns the process-wide RateLimiter, creating it on first use."""
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            _LIMITER = RateLimiter()
+        return _LIMITER
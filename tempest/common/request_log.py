@@ -0,0 +1,93 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import logging
+import threading
+import time
+
+_SINK = None
+_SINK_LOCK = threading.Lock()
+
+
+class _Record(object):
+    """Request record serialized to JSON only if it is actually written."""
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(self.fields, sort_keys=True)
+
+
+class RequestLog(object):
+    """
+    Structured, one JSON object per line, log of every HTTP request.
+
+    Records go to their own non-propagating logger so a high volume of
+    them neither reaches nor slows down the regular tempest log. Without
+    a log file the sink is disabled and record() returns at once.
+    """
+
+    def __init__(self, log_file=None):
+        self.logger = logging.getLogger('tempest.request_log')
+        self.logger.propagate = False
+        if log_file:
+            handler = logging.FileHandler(log_file)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+        else:
+            self.logger.setLevel(logging.CRITICAL + 1)
+
+    @property
+    def enabled(self):
+        return self.logger.isEnabledFor(logging.INFO)
+
+    def record(self, method, url, status, elapsed, request_bytes=None,
+               response_bytes=None):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        self.logger.info('%s', _Record({
+            'time': time.time(),
+            'method': method,
+            'url': url,
+            'status': status,
+            'elapsed': round(elapsed, 6),
+            'request_bytes': request_bytes,
+            'response_bytes': response_bytes,
+        }))
+
+
+def body_size(body, headers=None):
+    """Best-effort size of a body without reading it."""
+    if isinstance(body, basestring):
+        return len(body)
+    length = headers and (headers.get('content-length') or
+                          headers.get('Content-Length'))
+    if length:
+        return int(length)
+    return None
+
+
+def get_request_log(config):
+    """Returns the process-wide RequestLog, creating it on first use."""
+    global _SINK
+    with _SINK_LOCK:
+        if _SINK is None:
+            _SINK = RequestLog(config.http.request_log_file)
+        return _SINK
@@ -18,21 +18,34 @@
 
 import collections
 import hashlib
-import httplib2
 import json
+import logging as orig_logging
 from lxml import etree
 import re
-import time
 
+from tempest.common import batch
+from tempest.common import http
+from tempest.common import metrics
+from tempest.common import rate_limit
+from tempest.common import request_log
+from tempest.common import service_catalog
+from tempest.common import token_cache
+from tempest.common.utils.data_utils import utf8
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.openstack.common import log as logging
 from tempest.services.compute.xml.common import xml_to_json
 
-# redrive rate limited calls at most twice
-MAX_RECURSION_DEPTH = 2
 TOKEN_CHARS_RE = re.compile('^[-A-Za-z0-9+/=]*$')
 
 
+def _password_hash(password):
+    # Tokens are cached per password, so a wrong or changed password is
+    # not answered with the token of the right one; the cache, possibly
+    # a file, only ever sees a digest of it.
+    return hashlib.sha1(utf8(password or '')).hexdigest()
+
+
 class RestClient(object):
     TYPE = "json"
     LOG = logging.getLogger(__name__)
@@ -63,8 +76,11 @@ class RestClient(object):
                                        'location', 'proxy-authenticate',
                                        'retry-after', 'server',
                                        'vary', 'www-authenticate'))
-        dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
+        self.http_obj = http.get_http(self.config)
+        self.rate_limiter = rate_limit.get_rate_limiter()
+        self.request_log = request_log.get_request_log(self.config)
+        self.metrics = metrics.get_metrics(self.config)
+        self.token_cache = token_cache.get_token_cache(self.config)
 
     def _set_auth(self):
         """
@@ -80,12 +96,17 @@ class RestClient(object):
             auth_func(self.user, self.password, self.auth_url,
                       self.service, self.tenant_name))
 
+    def _get_auth_key(self):
+        return (self.auth_url, self.user, self.tenant_name, self.auth_version,
+                _password_hash(self.password))
+
     def clear_auth(self):
         """
         Can be called to clear the token and base_url so that the next request
         will fetch a new token and base_url.
         """
 
+        self.token_cache.invalidate(self._get_auth_key(), self.token)
         self.token = None
         self.base_url = None
 
@@ -119,6 +140,37 @@ class RestClient(object):
         Provides authentication via Keystone using v2 identity API.
         """
 
+        auth_data = self.token_cache.get_or_fetch(
+            (auth_url, user, tenant_name, 'v2', _password_hash(password)),
+            lambda: self._keystone_token(user, password, auth_url,
+                                         tenant_name))
+
+        mgmt_url = self._get_service_catalog(auth_data).get_endpoint(
+            service, self.region.get(service),
+            service_catalog.ServiceCatalog.interface_from_endpoint_type(
+                self.endpoint_url))
+        if mgmt_url is None:
+            raise exceptions.EndpointNotFound(service)
+
+        return auth_data['token'], mgmt_url
+
+    @staticmethod
+    def _get_service_catalog(auth_data):
+        """
+        Returns the ServiceCatalog index for a cached auth response,
+        building it only the first time any client resolves an endpoint
+        from that token.
+        """
+        catalog = auth_data.get('service_catalog')
+        if catalog is None:
+            catalog = service_catalog.ServiceCatalog(auth_data['catalog'],
+                                                     auth_data['version'])
+            auth_data['service_catalog'] = catalog
+        return catalog
+
+    def _keystone_token(self, user, password, auth_url, tenant_name):
+        """Requests a new token and service catalog from Keystone v2."""
+
         # Normalize URI to ensure /tokens is in it.
         if 'tokens' not in auth_url:
             auth_url = auth_url.rstrip('/') + '/tokens'
@@ -148,21 +200,13 @@ class RestClient(object):
                 print("Failed to obtain token for user: %s" % e)
                 raise
 
-            mgmt_url = None
-            for ep in auth_data['serviceCatalog']:
-                if ep["type"] == service:
-                    for _ep in ep['endpoints']:
-                        if service in self.region and \
-                                _ep['region'] == self.region[service]:
-                            mgmt_url = _ep[self.endpoint_url]
-                    if not mgmt_url:
-                        mgmt_url = ep['endpoints'][0][self.endpoint_url]
-                    break
-
-            if mgmt_url is None:
-                raise exceptions.EndpointNotFound(service)
-
-            return token, mgmt_url
+            return {
+                'token': token,
+                'expires': token_cache.parse_expiry(
+                    auth_data['token'].get('expires')),
+                'catalog': auth_data['serviceCatalog'],
+                'version': 'v2',
+            }
 
         elif resp.status == 401:
             raise exceptions.AuthenticationFailure(user=user,
@@ -174,6 +218,22 @@ class RestClient(object):
                          project_name, domain_id='default'):
         """Provides authentication using Identity API v3."""
 
+        auth_data = self.token_cache.get_or_fetch(
+            (auth_url, user, project_name, 'v3', _password_hash(password)),
+            lambda: self._identity_token_v3(user, password, auth_url,
+                                            project_name, domain_id))
+
+        mgmt_url = self._get_service_catalog(auth_data).get_endpoint(
+            service, self.region.get(service),
+            service_catalog.ServiceCatalog.interface_from_endpoint_type(
+                self.endpoint_url))
+
+        return auth_data['token'], mgmt_url
+
+    def _identity_token_v3(self, user, password, auth_url, project_name,
+                           domain_id):
+        """Requests a new token and service catalog from Identity API v3."""
+
         req_url = auth_url.rstrip('/') + '/auth/tokens'
 
         creds = {
@@ -210,39 +270,14 @@ class RestClient(object):
                                    req_url)
                 raise
 
-            catalog = json.loads(body)['token']['catalog']
-
-            mgmt_url = None
-            for service_info in catalog:
-                if service_info['type'] != service:
-                    continue  # this isn't the entry for us.
-
-                endpoints = service_info['endpoints']
-
-                # Look for an endpoint in the region if configured.
-                if service in self.region:
-                    region = self.region[service]
-
-                    for ep in endpoints:
-                        if ep['region'] != region:
-                            continue
-
-                        mgmt_url = ep['url']
-                        # FIXME(blk-u): this isn't handling endpoint type
-                        # (public, internal, admin).
-                        break
-
-                if not mgmt_url:
-                    # Didn't find endpoint for region, use the first.
-
-                    ep = endpoints[0]
-                    mgmt_url = ep['url']
-                    # FIXME(blk-u): this isn't handling endpoint type
-                    # (public, internal, admin).
-
-                break
-
-            return token, mgmt_url
+            token_data = json.loads(body)['token']
+            return {
+                'token': token,
+                'expires': token_cache.parse_expiry(
+                    token_data.get('expires_at')),
+                'catalog': token_data['catalog'],
+                'version': 'v3',
+            }
 
         elif resp.status == 401:
             raise exceptions.AuthenticationFailure(user=user,
@@ -257,8 +292,10 @@ class RestClient(object):
     def post(self, url, body, headers):
         return self.request('POST', url, headers, body)
 
-    def get(self, url, headers=None):
-        return self.request('GET', url, headers)
+    def get(self, url, headers=None, stream=False):
+        # Subclasses overriding request() may not take stream.
+        kwargs = {'stream': True} if stream else {}
+        return self.request('GET', url, headers, **kwargs)
 
     def delete(self, url, headers=None):
         return self.request('DELETE', url, headers)
@@ -283,7 +320,12 @@ class RestClient(object):
         return resp, versions
 
     def _log_request(self, method, req_url, headers, body):
-        self.LOG.info('Request: ' + method + ' ' + req_url)
+        # The adapter does its own work before the logger checks the
+        # level, so check it here before formatting anything.
+        if self.LOG.isEnabledFor(orig_logging.INFO):
+            self.LOG.info('Request: %s %s', method, req_url)
+        if not self.LOG.isEnabledFor(orig_logging.DEBUG):
+            return
         if headers:
             print_headers = headers
             if 'X-Auth-Token' in headers and headers['X-Auth-Token']:
@@ -291,29 +333,38 @@ class RestClient(object):
                 if len(token) > 64 and TOKEN_CHARS_RE.match(token):
                     print_headers = headers.copy()
                     print_headers['X-Auth-Token'] = "<Token omitted>"
-            self.LOG.debug('Request Headers: ' + str(print_headers))
-        if body:
-            str_body = str(body)
-            length = len(str_body)
-            self.LOG.debug('Request Body: ' + str_body[:2048])
-            if length >= 2048:
-                self.LOG.debug("Large body (%d) md5 summary: %s", length,
-                               hashlib.md5(str_body).hexdigest())
+            self.LOG.debug('Request Headers: %s', print_headers)
+        # Streamed bodies are summarized by _log_stream once sent.
+        if body and isinstance(body, basestring):
+            self._log_body('Request', body)
 
     def _log_response(self, resp, resp_body):
-        status = resp['status']
-        self.LOG.info("Response Status: " + status)
+        if self.LOG.isEnabledFor(orig_logging.INFO):
+            self.LOG.info("Response Status: %s", resp['status'])
+        if not self.LOG.isEnabledFor(orig_logging.DEBUG):
+            return
         headers = resp.copy()
         del headers['status']
         if len(headers):
-            self.LOG.debug('Response Headers: ' + str(headers))
-        if resp_body:
-            str_body = str(resp_body)
-            length = len(str_body)
-            self.LOG.debug('Response Body: ' + str_body[:2048])
-            if length >= 2048:
-                self.LOG.debug("Large body (%d) md5 summary: %s", length,
-                               hashlib.md5(str_body).hexdigest())
+            self.LOG.debug('Response Headers: %s', headers)
+        if isinstance(resp_body, http.StreamingBody):
+            resp_body.md5 = hashlib.md5()
+            resp_body.add_done_callback(
+                lambda body, complete: self._log_stream('Response', body))
+        elif resp_body:
+            self._log_body('Response', resp_body)
+
+    def _log_body(self, kind, body):
+        str_body = str(body)
+        length = len(str_body)
+        self.LOG.debug('%s Body: %s', kind, str_body[:2048])
+        if length >= 2048:
+            self.LOG.debug("Large body (%d) md5 summary: %s", length,
+                           hashlib.md5(str_body).hexdigest())
+
+    def _log_stream(self, kind, body):
+        self.LOG.debug("%s body streamed (%d) md5 summary: %s", kind,
+                       body.length, body.md5.hexdigest())
 
     def _parse_resp(self, body):
         return json.loads(body)
@@ -347,41 +398,73 @@ class RestClient(object):
             self.LOG.warning("status >= 400 response with empty body")
 
     def _request(self, method, url,
-                 headers=None, body=None):
-        """A simple HTTP request interface."""
+                 headers=None, body=None, stream=False):
+        """
+        A simple HTTP request interface. body may also be a file-like
+        object or an iterator of strings; with stream, a successful
+        response body is returned as an http.StreamingBody.
+        """
 
         req_url = "%s/%s" % (self.base_url, url)
+        headers, body, reader = http.prepare_body(
+            headers, body, hashing=self.LOG.isEnabledFor(orig_logging.DEBUG))
         self._log_request(method, req_url, headers, body)
-        resp, resp_body = self.http_obj.request(req_url, method,
-                                                headers=headers, body=body)
+        timer = metrics.Timer()
+        resp, resp_body = self.http_obj.request(
+            req_url, method, headers=headers, body=body, stream=stream,
+            timer=timer if self.metrics.enabled else None)
+        timer.stop()
+        self.metrics.observe(self.service, method, req_url, resp.status,
+                             timer)
+        if self.request_log.enabled:
+            self.request_log.record(
+                method, req_url, resp.status, timer.phases['total'],
+                reader.length if reader else request_log.body_size(
+                    body, headers),
+                request_log.body_size(resp_body, resp))
+        if reader is not None:
+            self._log_stream('Request', reader)
         self._log_response(resp, resp_body)
         self.response_checker(method, url, headers, body, resp, resp_body)
 
         return resp, resp_body
 
     def request(self, method, url,
-                headers=None, body=None):
+                headers=None, body=None, stream=False):
         retry = 0
-        if (self.token is None) or (self.base_url is None):
+        # NOTE: tokens are shared with every client using the same
+        # credentials, so also re-authenticate once another client has
+        # dropped or refreshed the cached one.
+        if ((self.token is None) or (self.base_url is None) or
+                not self.token_cache.is_valid(self._get_auth_key(),
+                                              self.token)):
             self._set_auth()
 
         if headers is None:
             headers = {}
         headers['X-Auth-Token'] = self.token
 
-        resp, resp_body = self._request(method, url,
-                                        headers=headers, body=body)
+        self.rate_limiter.wait(self.base_url, method, url)
+        resp, resp_body = self._request(method, url, headers=headers,
+                                        body=body, stream=stream)
 
+        # Rate limited requests are queued behind the limiter, which
+        # now knows to pace every client using this endpoint. A streamed
+        # request body has been consumed and cannot be sent again.
         while (resp.status == 413 and
                'retry-after' in resp and
                 not self.is_absolute_limit(
                     resp, self._parse_resp(resp_body)) and
-                retry < MAX_RECURSION_DEPTH):
+                retry < self.config.http.rate_limit_retries and
+                (body is None or isinstance(body, basestring))):
             retry += 1
-            delay = int(resp['retry-after'])
-            time.sleep(delay)
-            resp, resp_body = self._request(method, url,
-                                            headers=headers, body=body)
+            self.rate_limiter.rate_limited(self.base_url, method, url,
+                                           float(resp['retry-after']))
+            self.rate_limiter.wait(self.base_url, method, url)
+            resp, resp_body = self._request(method, url, headers=headers,
+                                            body=body, stream=stream)
+        if resp.status == 401:
+            self.token_cache.invalidate(self._get_auth_key(), self.token)
         self._error_checker(method, url, headers, body,
                             resp, resp_body)
         return resp, resp_body
@@ -485,15 +568,23 @@ class RestClient(object):
             return True
         return 'exceed' in over_limit.get('message', 'blabla')
 
+    def batch(self, func, items, max_workers=None):
+        """
+        Calls func(item) concurrently for every item, typically with func
+        a method of this client, and returns a list of
+        batch.BatchResult in the order of items. Errors are collected
+        per item instead of being raised.
+        """
+        if max_workers is None:
+            max_workers = self.config.http.batch_workers
+        return batch.run(func, items, max_workers)
+
     def wait_for_resource_deletion(self, id):
         """Waits for a resource to be deleted."""
-        start_time = int(time.time())
-        while True:
-            if self.is_resource_deleted(id):
-                return
-            if int(time.time()) - start_time >= self.build_timeout:
-                raise exceptions.TimeoutException
-            time.sleep(self.build_interval)
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                '%s deletion' % self.__class__.__name__)
+        if not waiter.wait(lambda: self.is_resource_deleted(id)):
+            raise exceptions.TimeoutException
 
     def is_resource_deleted(self, id):
         """
@@ -0,0 +1,85 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+INTERFACES = ('public', 'internal', 'admin')
+
+
+class ServiceCatalog(object):
+    """
+    Index over the service catalog returned with a Keystone token.
+
+    The catalog is walked once; afterwards every endpoint lookup is a
+    dict lookup on (service type, region, interface). Both the v2
+    'serviceCatalog' layout (one endpoint carrying publicURL, internalURL
+    and adminURL) and the v3 'catalog' layout (one endpoint per interface)
+    are understood.
+    """
+
+    def __init__(self, catalog, version='v2'):
+        self._endpoints = {}
+        for service in catalog:
+            for ep in service.get('endpoints', []):
+                if version == 'v3':
+                    self._add(service['type'], ep.get('region'),
+                              ep.get('interface'), ep['url'])
+                    continue
+                for interface in INTERFACES:
+                    url = ep.get(interface + 'URL')
+                    if url:
+                        self._add(service['type'], ep.get('region'),
+                                  interface, url)
+
+    def _add(self, service_type, region, interface, url):
+        # The first endpoint listed wins, and it is also indexed under
+        # None wildcards so lookups can fall back to any region and then
+        # to any interface.
+        for key in ((service_type, region, interface),
+                    (service_type, None, interface),
+                    (service_type, region, None),
+                    (service_type, None, None)):
+            self._endpoints.setdefault(key, url)
+
+    @staticmethod
+    def interface_from_endpoint_type(endpoint_type):
+        """Maps a v2 endpoint type such as 'publicURL' to 'public'."""
+        if endpoint_type.endswith('URL'):
+            return endpoint_type[:-3]
+        return endpoint_type
+
+    def get_endpoint(self, service_type, region=None, interface='public'):
+        """
+        Returns the URL for service_type, preferring an endpoint in region
+        with the given interface. Falls back to the first endpoint with
+        the interface, then to the first endpoint of the service. Returns
+        None if the catalog has no such service.
+        """
+        if region is not None:
+            keys = ((service_type, region, interface),
+                    (service_type, None, interface),
+                    (service_type, region, None),
+                    (service_type, None, None))
+        else:
+            keys = ((service_type, None, interface),
+                    (service_type, None, None))
+        for key in keys:
+            url = self._endpoints.get(key)
+            if url is not None:
+                return url
+        return None
+
+    def has_service(self, service_type):
+        return (service_type, None, None) in self._endpoints
@@ -0,0 +1,184 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from tempest.common import batch
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# The kinds of resources that have to be gone before a resource of the
+# given kind can be deleted.
+DELETE_AFTER = {
+    'server': ('floating_ip',),
+    'port': ('floating_ip', 'server'),
+    'subnet': ('floating_ip', 'server', 'port'),
+    'network': ('floating_ip', 'server', 'port', 'subnet'),
+    'router': ('floating_ip', 'server', 'port', 'subnet', 'network'),
+    'security_group': ('server', 'port'),
+    'volume': ('server', 'snapshot'),
+    'user': ('server', 'keypair', 'floating_ip', 'snapshot', 'volume'),
+    'tenant': ('server', 'keypair', 'floating_ip', 'snapshot', 'volume',
+               'user'),
+}
+
+# Kinds of the resources of the official clients, by class name.
+CLASS_KINDS = {
+    'Server': 'server',
+    'FloatingIP': 'floating_ip',
+    'DeletableFloatingIp': 'floating_ip',
+    'DeletablePort': 'port',
+    'DeletableSubnet': 'subnet',
+    'DeletableNetwork': 'network',
+    'DeletableRouter': 'router',
+    'SecurityGroup': 'security_group',
+    'Keypair': 'keypair',
+    'Volume': 'volume',
+    'Snapshot': 'snapshot',
+    'Image': 'image',
+}
+
+
+def resource_kind(thing):
+    """Returns the kind of an official client resource, or None."""
+    return CLASS_KINDS.get(thing.__class__.__name__)
+
+
+def is_not_found(exc):
+    # Clients are expected to raise an exception called 'NotFound' for
+    # resources that do not exist.
+    return any(cls.__name__ == 'NotFound' for cls in type(exc).__mro__)
+
+
+class _Resource(object):
+
+    def __init__(self, index, name, delete, kind, is_deleted):
+        self.index = index
+        self.name = name
+        self.delete = delete
+        self.kind = kind
+        self.is_deleted = is_deleted
+
+    def must_wait_for(self, other):
+        """Whether other has to be gone before this is deleted."""
+        if self.kind is None or other.kind is None:
+            # Without known kinds keep to the reverse creation order.
+            return other.index > self.index
+        return other.kind in DELETE_AFTER.get(self.kind, ())
+
+
+class Teardown(object):
+    """
+    Deletes resources concurrently, in the order their kinds require.
+
+    Every resource none of whose prerequisites are left is deleted, on
+    up to max_workers threads, as soon as the last of them is gone. The
+    resources being deleted are polled together with is_deleted every
+    interval seconds, for up to timeout seconds each. A resource without
+    a kind waits for, and is waited for by, the resources according to
+    the order they were added in, as a serial teardown would. Resources
+    that could not be deleted are reported in leaked.
+    """
+
+    def __init__(self, max_workers, timeout, interval):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.interval = interval
+        self.resources = []
+        self.errors = []
+        self.leaked = []
+
+    def add(self, name, delete, kind=None, is_deleted=None):
+        """
+        Adds a resource, in creation order. delete() deletes it and
+        is_deleted(), if given, tells whether it is gone; a resource
+        without is_deleted is considered gone once delete() returns.
+        """
+        self.resources.append(_Resource(len(self.resources), name, delete,
+                                        kind, is_deleted))
+
+    def _ready(self, remaining, unfinished):
+        return [resource for resource in remaining
+                if not any(resource.must_wait_for(other)
+                           for other in unfinished if other is not resource)]
+
+    def _delete(self, resource):
+        LOG.debug("Deleting %s", resource.name)
+        try:
+            resource.delete()
+        except Exception as exc:
+            if not is_not_found(exc):
+                raise
+            return False
+        return resource.is_deleted is not None
+
+    def _poll(self, waiting):
+        """Checks the resources in waiting, removing those done with."""
+        now = time.time()
+        results = batch.run(lambda resource: resource.is_deleted(),
+                            list(waiting), self.max_workers)
+        for result in results:
+            resource = result.item
+            if result.error is not None:
+                self.leaked.append((resource.name, "error checking "
+                                    "deletion: %s" % result.error))
+            elif not result.value:
+                if now < waiting[resource]:
+                    continue
+                self.leaked.append((resource.name, "still present after "
+                                    "%ss" % self.timeout))
+            del waiting[resource]
+
+    def run(self):
+        """
+        Deletes every resource added.
+
+        :returns: the (name, reason) of the resources that leaked, a
+            delete that raised counting as one.
+        """
+        remaining = list(self.resources)
+        # Resources being deleted, with the time to give up waiting.
+        waiting = {}
+        while remaining or waiting:
+            ready = self._ready(remaining, remaining + waiting.keys())
+            if not ready and not waiting:
+                # The kinds and the creation order disagree, fall back
+                # to the latter.
+                ready = [max(remaining, key=lambda resource: resource.index)]
+            if ready:
+                for result in batch.run(self._delete, ready,
+                                        self.max_workers):
+                    if result.error is not None:
+                        self.errors.append(result.exc_info)
+                        self.leaked.append((result.item.name, "delete "
+                                            "failed: %s" % result.error))
+                        LOG.error("Deleting %s failed", result.item.name,
+                                  exc_info=result.exc_info)
+                    elif result.value:
+                        waiting[result.item] = time.time() + self.timeout
+                remaining = [resource for resource in remaining
+                             if resource not in ready]
+                continue
+            self._poll(waiting)
+            if waiting and not self._ready(remaining,
+                                           remaining + waiting.keys()):
+                time.sleep(self.interval)
+        self.resources = []
+        for name, reason in self.leaked:
+            LOG.warning("Leaked %s: %s", name, reason)
+        return self.leaked
@@ -0,0 +1,173 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import calendar
+import json
+import os
+import threading
+import time
+
+from tempest.openstack.common import lockutils
+from tempest.openstack.common import log as logging
+from tempest.openstack.common import timeutils
+
+LOG = logging.getLogger(__name__)
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def parse_expiry(expires):
+    """Converts a Keystone ISO 8601 expiry into a UTC epoch timestamp."""
+    if not expires:
+        return None
+    at = timeutils.normalize_time(timeutils.parse_isotime(expires))
+    return calendar.timegm(at.utctimetuple())
+
+
+# Entry fields persisted to the cache file; anything else in an entry is
+# derived, process-local data such as the ServiceCatalog index.
+FILE_FIELDS = ('token', 'expires', 'catalog', 'version')
+
+
+class TokenCache(object):
+    """
+    Thread-safe cache of Keystone tokens and their service catalogs.
+
+    Entries are keyed by (auth_url, user, tenant_name, auth_version) and
+    hold a dict with the 'token', its 'expires' epoch timestamp (or None),
+    the raw 'catalog' and the identity API 'version' it came from. An
+    entry is treated as missing refresh_margin seconds before it expires
+    so callers re-authenticate ahead of time. When cache_file is set the
+    entries are also shared with other processes through that file.
+    """
+
+    def __init__(self, refresh_margin=60, cache_file=None):
+        self.refresh_margin = refresh_margin
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        self._entries = {}
+
+    def _is_fresh(self, entry):
+        expires = entry.get('expires')
+        return expires is None or time.time() < expires - self.refresh_margin
+
+    def get(self, key):
+        """Returns the fresh entry for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.cache_file:
+            entry = self._read_file().get(self._file_key(key))
+            if entry is not None:
+                with self._lock:
+                    self._entries[key] = entry
+        if entry is not None and self._is_fresh(entry):
+            return entry
+        return None
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Returns the fresh entry for key, calling fetch() to build it on a
+        miss. Concurrent misses for the same key only call fetch() once.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            entry = self.get(key)
+            if entry is None:
+                entry = fetch()
+                self.set(key, entry)
+        return entry
+
+    def is_valid(self, key, token):
+        """Checks that token is still the fresh cached token for key."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return (entry is not None and entry['token'] == token and
+                self._is_fresh(entry))
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+        if self.cache_file:
+            with self._file_lock():
+                entries = self._read_file()
+                entries[self._file_key(key)] = dict(
+                    (field, entry.get(field)) for field in FILE_FIELDS)
+                self._write_file(entries)
+
+    def invalidate(self, key, token=None):
+        """
+        Drops the entry for key. If token is given the entry is only
+        dropped while it still holds that token, so a token another
+        client already refreshed is left alone.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and token in (None, entry['token']):
+                del self._entries[key]
+        if self.cache_file:
+            file_key = self._file_key(key)
+            with self._file_lock():
+                entries = self._read_file()
+                entry = entries.get(file_key)
+                if entry is not None and token in (None, entry['token']):
+                    del entries[file_key]
+                    self._write_file(entries)
+
+    @staticmethod
+    def _file_key(key):
+        return '|'.join(str(part) for part in key)
+
+    def _file_lock(self):
+        return lockutils.lock('token-cache', 'tempest-', external=True,
+                              lock_path=os.path.dirname(
+                                  os.path.abspath(self.cache_file)))
+
+    def _read_file(self):
+        try:
+            with open(self.cache_file) as cache_file:
+                return json.load(cache_file)
+        except (IOError, ValueError):
+            return {}
+
+    def _write_file(self, entries):
+        tmp_file = '%s.%d' % (self.cache_file, os.getpid())
+        try:
+            # Tokens are credentials; keep the file private to the user.
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'w') as cache_file:
+                json.dump(entries, cache_file)
+            os.rename(tmp_file, self.cache_file)
+        except (IOError, OSError):
+            LOG.warning("Unable to write token cache file %s",
+                        self.cache_file, exc_info=True)
+
+
+def get_token_cache(config):
+    """Returns the process-wide TokenCache, creating it on first use."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = TokenCache(config.identity.token_refresh_margin,
+                                config.identity.token_cache_file)
+        return _CACHE
@@ -19,6 +19,7 @@ import itertools
 import random
 import re
 import urllib
+import uuid
 
 from tempest import exceptions
 
@@ -27,10 +28,28 @@ def rand_name(name='test'):
     return name + str(random.randint(1, 0x7fffffff))
 
 
+def unique_name(name='test'):
+    """
+    Returns name with a random 64 bit suffix. Unlike rand_name, names
+    made by concurrent processes practically never collide.
+    """
+    return '%s-%s' % (name, uuid.uuid4().hex[:16])
+
+
 def rand_int_id(start=0, end=0x7fffffff):
     return random.randint(start, end)
 
 
+def utf8(value):
+    """
+    Returns value encoded to UTF-8 if it is unicode, such as names from
+    a JSON listing, which urllib cannot quote or urlencode.
+    """
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
 def build_url(host, port, api_version=None, path=None,
               params=None, use_ssl=False):
     """Build the request URL from given host, port, path and parameters."""
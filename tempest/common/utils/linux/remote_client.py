@@ -17,7 +17,7 @@ import time
 
 from tempest.common.ssh import Client
 from tempest.common import utils
-from tempest.config import TempestConfig
+from tempest import config
 from tempest.exceptions import ServerUnreachable
 from tempest.exceptions import SSHTimeout
 
@@ -26,10 +26,11 @@ class RemoteClient():
 
     #Note(afazekas): It should always get an address instead of server
     def __init__(self, server, username, password=None, pkey=None):
-        ssh_timeout = TempestConfig().compute.ssh_timeout
-        network = TempestConfig().compute.network_for_ssh
-        ip_version = TempestConfig().compute.ip_version_for_ssh
-        ssh_channel_timeout = TempestConfig().compute.ssh_channel_timeout
+        conf = config.get_config()
+        ssh_timeout = conf.compute.ssh_timeout
+        network = conf.compute.network_for_ssh
+        ip_version = conf.compute.ip_version_for_ssh
+        ssh_channel_timeout = conf.compute.ssh_channel_timeout
         if isinstance(server, basestring):
             ip_address = server
         else:
@@ -0,0 +1,246 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+import threading
+import time
+
+from tempest import config
+from tempest import exceptions
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class DurationHistory(object):
+    """
+    Remembers how long waits for each resource type took, as an
+    exponentially weighted moving average, so later waits for the same
+    kind of resource can skip polls that are bound to fail.
+    """
+
+    def __init__(self, weight=0.3):
+        self.weight = weight
+        self._lock = threading.Lock()
+        self._durations = {}
+
+    def record(self, resource_type, duration):
+        with self._lock:
+            previous = self._durations.get(resource_type)
+            if previous is None:
+                self._durations[resource_type] = duration
+            else:
+                self._durations[resource_type] = (
+                    self.weight * duration + (1 - self.weight) * previous)
+
+    def expected(self, resource_type):
+        with self._lock:
+            return self._durations.get(resource_type)
+
+
+HISTORY = DurationHistory()
+
+
+class FixedInterval(object):
+    """Polls every interval seconds, the historical Tempest behaviour."""
+
+    def __init__(self, interval):
+        self.interval = interval
+
+    def delays(self, expected=None):
+        while True:
+            yield self.interval
+
+
+class ExponentialBackoff(object):
+    """
+    Polls quickly at first and backs off exponentially up to max_interval.
+
+    Every delay is lengthened or shortened by a random fraction of up to
+    jitter so that many workers waiting on the same API do not poll in
+    lockstep. With use_history the first delay is most of the expected
+    duration for the resource type, if one is known, and the backoff
+    then carries on from the interval it would have reached by then.
+    """
+
+    def __init__(self, max_interval, initial_interval=1.0, factor=2.0,
+                 jitter=0.2, use_history=False):
+        self.max_interval = max_interval
+        self.initial_interval = min(initial_interval, max_interval)
+        self.factor = factor
+        self.jitter = jitter
+        self.use_history = use_history
+
+    def _next(self, interval):
+        return min(interval * self.factor, self.max_interval)
+
+    def delays(self, expected=None):
+        interval = self.initial_interval
+        if self.use_history and expected:
+            skipped = expected * 0.8
+            yield skipped
+            waited = interval
+            while waited < skipped:
+                interval = self._next(interval)
+                waited += interval
+        while True:
+            yield interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            interval = self._next(interval)
+
+
+def make_strategy(interval):
+    """
+    Builds the polling strategy selected in the [waiter] section. Fixed
+    polling waits interval seconds between polls, backoff up to the
+    max_interval of the section or interval, whichever is longer.
+    """
+    conf = config.get_config().waiter
+    if conf.strategy == 'fixed':
+        return FixedInterval(interval)
+    return ExponentialBackoff(max(conf.max_interval, interval),
+                              conf.initial_interval, conf.backoff_factor,
+                              conf.jitter,
+                              use_history=conf.strategy == 'adaptive')
+
+
+class Waiter(object):
+    """
+    Polls until a condition holds or timeout seconds elapse.
+
+    After wait() returns, value holds the last polled value, elapsed the
+    seconds spent waiting and polls the number of calls made.
+    """
+
+    def __init__(self, timeout, interval, resource_type=None,
+                 strategy=None):
+        self.timeout = timeout
+        self.resource_type = resource_type
+        self.strategy = strategy or make_strategy(interval)
+        self.value = None
+        self.elapsed = 0
+        self.polls = 0
+
+    def _history_key(self, first_value):
+        # Waits for the same target from different starting states (a
+        # reboot versus a build, say) take very different times.
+        try:
+            hash(first_value)
+        except TypeError:
+            return self.resource_type
+        return (self.resource_type, first_value)
+
+    def wait(self, fetch, done=bool):
+        """
+        Calls fetch() until done(value) is true for the value it returns.
+        fetch may raise to abort the wait.
+
+        :returns: True once the condition holds, False on timeout.
+        """
+        start = time.time()
+        self.value = fetch()
+        self.polls = 1
+        if done(self.value):
+            return True
+        key = self._history_key(self.value)
+        delays = self.strategy.delays(HISTORY.expected(key))
+        while True:
+            self.elapsed = time.time() - start
+            remaining = self.timeout - self.elapsed
+            if remaining <= 0:
+                LOG.debug("Wait for %s timed out after %.1fs and %d poll(s)",
+                          self.resource_type or 'condition', self.elapsed,
+                          self.polls)
+                return False
+            time.sleep(min(next(delays), remaining))
+            self.value = fetch()
+            self.polls += 1
+            if done(self.value):
+                self.elapsed = time.time() - start
+                if self.resource_type:
+                    HISTORY.record(key, self.elapsed)
+                LOG.debug("Wait for %s finished in %.1fs after %d poll(s)",
+                          self.resource_type or 'condition', self.elapsed,
+                          self.polls)
+                return True
+
+
+# Status reported for a resource that no longer shows up in its listing.
+DELETED = 'DELETED'
+
+
+class BatchWaiter(object):
+    """
+    Waits for many resources of one kind with a single list call per poll.
+
+    list_statuses is called once per poll and returns a dict mapping the
+    id of every listed resource to its status. Resources are retired as
+    they reach the target status; a resource missing from the listing
+    has the DELETED status. If the listing may leave out resources that
+    still exist, get_status(id) is called for those missing from it and
+    returns the status of one, or DELETED. After wait() returns, pending
+    holds the ids that did not make it and statuses their last seen
+    status.
+    """
+
+    def __init__(self, list_statuses, timeout, interval, resource_type=None,
+                 error_statuses=('ERROR',), get_status=None):
+        self.list_statuses = list_statuses
+        self.timeout = timeout
+        self.interval = interval
+        self.resource_type = resource_type
+        self.error_statuses = error_statuses
+        self.get_status = get_status
+        self.pending = set()
+        self.statuses = {}
+
+    def wait(self, ids, status, error=None):
+        """
+        Polls until every resource in ids has the given status.
+
+        :param error: called with the id of a resource found in one of
+            the error_statuses; the exception it returns is raised at
+            once instead of waiting for the others.
+        :returns: True once all resources are done, False on timeout.
+        :raises NotFound: if a resource is deleted while waiting for
+            another status.
+        """
+        self.pending = set(ids)
+        self.statuses = {}
+
+        def poll():
+            listed = self.list_statuses()
+            for resource_id in list(self.pending):
+                current = listed.get(resource_id)
+                if current is None:
+                    current = DELETED
+                    if self.get_status is not None:
+                        current = self.get_status(resource_id)
+                self.statuses[resource_id] = current
+                if current == status:
+                    self.pending.discard(resource_id)
+                elif current == DELETED:
+                    raise exceptions.NotFound(
+                        "%s was deleted while waiting for it to become %s"
+                        % (resource_id, status))
+                elif error is not None and current in self.error_statuses:
+                    raise error(resource_id)
+            return not self.pending
+
+        if not self.pending:
+            return True
+        waiter = Waiter(self.timeout, self.interval, self.resource_type)
+        return waiter.wait(poll)
@@ -19,11 +19,11 @@ from __future__ import print_function
 
 import os
 import sys
+import threading
 
 
 from oslo.config import cfg
 
-from tempest.common.utils.misc import singleton
 from tempest.openstack.common import log as logging
 
 
@@ -79,6 +79,26 @@ IdentityGroup = [
                default='pass',
                help="API key to use when authenticating as admin.",
                secret=True),
+    cfg.IntOpt('token_refresh_margin',
+               default=60,
+               help="Seconds before a cached token expires at which clients "
+                    "request a new one."),
+    cfg.StrOpt('token_cache_file',
+               default=None,
+               help="File used to share cached tokens and service catalogs "
+                    "between Tempest processes. Tokens are only cached in "
+                    "memory if unset."),
+    cfg.StrOpt('credential_pool_file',
+               default=None,
+               help="File holding a pool of tenants and users that test "
+                    "classes lease instead of creating their own when "
+                    "tenant isolation is enabled. Each class creates and "
+                    "deletes its own if unset."),
+    cfg.IntOpt('credential_pool_size',
+               default=4,
+               help="Number of credentials of each kind (primary, alt and "
+                    "admin) created when the credential pool is first "
+                    "used. The pool grows if more are leased at once."),
 ]
 
 
@@ -270,7 +290,16 @@ ImageGroup = [
     cfg.StrOpt('http_image',
                default='http://download.cirros-cloud.net/0.3.1/'
                'cirros-0.3.1-x86_64-uec.tar.gz',
-               help='http accessable image')
+               help='http accessable image'),
+    cfg.IntOpt('chunk_size',
+               default=65536,
+               help="Size in bytes of the chunks image data is uploaded "
+                    "and downloaded in."),
+    cfg.IntOpt('schema_cache_ttl',
+               default=300,
+               help="Seconds an Image v2 API schema is used before it is "
+                    "revalidated with the server. 0 revalidates it before "
+                    "every use."),
 ]
 
 
@@ -485,6 +514,87 @@ def register_boto_opts(conf):
     for opt in BotoConfig:
         conf.register_opt(opt, group='boto')
 
+http_group = cfg.OptGroup(name='http', title='HTTP Client Options')
+
+HttpGroup = [
+    cfg.IntOpt('max_connections_per_host',
+               default=10,
+               help="Maximum number of concurrent connections the shared "
+                    "connection pool opens to a single endpoint."),
+    cfg.IntOpt('connection_idle_timeout',
+               default=60,
+               help="Seconds an idle keep-alive connection is kept in the "
+                    "shared connection pool before it is closed."),
+    cfg.IntOpt('connection_wait_timeout',
+               default=300,
+               help="Seconds a request waits for a free connection to an "
+                    "endpoint that has max_connections_per_host in use "
+                    "before it fails."),
+    cfg.IntOpt('batch_workers',
+               default=8,
+               help="Number of threads a client uses to run batched "
+                    "requests, such as bulk deletes during cleanup."),
+    cfg.IntOpt('rate_limit_retries',
+               default=5,
+               help="How many times a rate limited request is queued and "
+                    "sent again before RateLimitExceeded is raised."),
+    cfg.StrOpt('request_log_file',
+               default=None,
+               help="If set, one JSON record per HTTP request (method, "
+                    "URL, status, latency and body sizes) is appended to "
+                    "this file, separately from the regular log."),
+    cfg.StrOpt('metrics_file',
+               default=None,
+               help="If set, latency histograms of all HTTP requests are "
+                    "collected, attached to each test's results and "
+                    "written to this file at exit. %(pid)s is replaced by "
+                    "the process id, for runs with several workers."),
+    cfg.StrOpt('metrics_format',
+               default='json',
+               help="Format of the metrics file: 'json' or 'prometheus' "
+                    "text exposition format."),
+]
+
+
+def register_http_opts(conf):
+    conf.register_group(http_group)
+    for opt in HttpGroup:
+        conf.register_opt(opt, group='http')
+
+waiter_group = cfg.OptGroup(name='waiter', title='Resource Waiter Options')
+
+WaiterGroup = [
+    cfg.StrOpt('strategy',
+               default='adaptive',
+               help="How status waiters poll: 'fixed' polls every "
+                    "build_interval seconds, 'backoff' starts with fast "
+                    "polls and backs off exponentially up to max_interval, "
+                    "'adaptive' additionally skips polls based on how long "
+                    "the same kind of resource took earlier in the run."),
+    cfg.FloatOpt('initial_interval',
+                 default=1.0,
+                 help="Seconds between the first polls of a backoff wait."),
+    cfg.FloatOpt('max_interval',
+                 default=60.0,
+                 help="Longest seconds between the polls of a backoff "
+                      "wait, or the build_interval of the service if that "
+                      "is longer."),
+    cfg.FloatOpt('backoff_factor',
+                 default=2.0,
+                 help="Factor the poll interval grows by after each poll."),
+    cfg.FloatOpt('jitter',
+                 default=0.2,
+                 help="Largest random fraction each poll interval is "
+                      "lengthened or shortened by, so parallel waiters do "
+                      "not poll in lockstep."),
+]
+
+
+def register_waiter_opts(conf):
+    conf.register_group(waiter_group)
+    for opt in WaiterGroup:
+        conf.register_opt(opt, group='waiter')
+
 stress_group = cfg.OptGroup(name='stress', title='Stress Test Options')
 
 StressGroup = [
@@ -589,8 +699,7 @@ def register_service_available_opts(conf):
         conf.register_opt(opt, group='service_available')
 
 
-@singleton
-class TempestConfig:
+class TempestConfigPrivate(object):
     """Provides OpenStack configuration information."""
 
     DEFAULT_CONFIG_DIR = os.path.join(
@@ -601,7 +710,6 @@ class TempestConfig:
 
     def __init__(self):
         """Initialize a configuration from a conf directory and conf file."""
-        config_files = []
         failsafe_path = "/etc/tempest/" + self.DEFAULT_CONFIG_FILE
 
         # Environment variables override defaults...
@@ -619,10 +727,9 @@ class TempestConfig:
         if not os.path.exists(path):
             msg = "Config file %s not found" % path
             print(RuntimeError(msg), file=sys.stderr)
-        else:
-            config_files.append(path)
 
-        cfg.CONF([], project='tempest', default_config_files=config_files)
+        self.path = path
+        self._parse()
         logging.setup('tempest')
         LOG = logging.getLogger('tempest')
         LOG.info("Using tempest config file %s" % path)
@@ -637,6 +744,8 @@ class TempestConfig:
         register_orchestration_opts(cfg.CONF)
         register_dashboard_opts(cfg.CONF)
         register_boto_opts(cfg.CONF)
+        register_http_opts(cfg.CONF)
+        register_waiter_opts(cfg.CONF)
         register_compute_admin_opts(cfg.CONF)
         register_stress_opts(cfg.CONF)
         register_scenario_opts(cfg.CONF)
@@ -651,11 +760,79 @@ class TempestConfig:
         self.orchestration = cfg.CONF.orchestration
         self.dashboard = cfg.CONF.dashboard
         self.boto = cfg.CONF.boto
+        self.http = cfg.CONF.http
+        self.waiter = cfg.CONF.waiter
         self.compute_admin = cfg.CONF['compute-admin']
         self.stress = cfg.CONF.stress
         self.scenario = cfg.CONF.scenario
         self.service_available = cfg.CONF.service_available
+        self._set_compute_admin_defaults()
+
+    def _get_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def _parse(self):
+        self.mtime = self._get_mtime()
+        config_files = [self.path] if self.mtime is not None else []
+        cfg.CONF([], project='tempest', default_config_files=config_files)
+
+    def _set_compute_admin_defaults(self):
+        for name in ('username', 'password', 'tenant_name'):
+            cfg.CONF.clear_override(name, group='compute-admin')
         if not self.compute_admin.username:
-            self.compute_admin.username = self.identity.admin_username
-            self.compute_admin.password = self.identity.admin_password
-            self.compute_admin.tenant_name = self.identity.admin_tenant_name
+            cfg.CONF.set_override('username', self.identity.admin_username,
+                                  group='compute-admin')
+            cfg.CONF.set_override('password', self.identity.admin_password,
+                                  group='compute-admin')
+            cfg.CONF.set_override('tenant_name',
+                                  self.identity.admin_tenant_name,
+                                  group='compute-admin')
+
+    def reload(self):
+        """Re-parses the config file.
+
+        The group attributes (compute, identity, ...) look values up on
+        access, so references held by callers see the new values.
+        """
+        self._parse()
+        self._set_compute_admin_defaults()
+        LOG = logging.getLogger('tempest')
+        LOG.info("Reloaded tempest config file %s" % self.path)
+
+    def reload_if_changed(self):
+        """Re-parses the config file if it changed since it was parsed."""
+        if self._get_mtime() != self.mtime:
+            self.reload()
+            return True
+        return False
+
+
+_CONFIG = None
+_CONFIG_LOCK = threading.Lock()
+
+
+def get_config():
+    """
+    Returns the process-wide configuration, parsing the config file the
+    first time. It never touches the file afterwards, so it is the
+    accessor to use on hot paths.
+    """
+    global _CONFIG
+    if _CONFIG is None:
+        with _CONFIG_LOCK:
+            if _CONFIG is None:
+                _CONFIG = TempestConfigPrivate()
+    return _CONFIG
+
+
+def TempestConfig():
+    """
+    Returns the process-wide configuration, re-parsing the config file
+    if it was modified since it was last read.
+    """
+    conf = get_config()
+    conf.reload_if_changed()
+    return conf
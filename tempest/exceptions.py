@@ -129,6 +129,15 @@ class ImageFault(TempestException):
     message = "Got image fault"
 
 
+class ChecksumMismatch(TempestException):
+    message = "Data of %(name)s has checksum %(actual)s, expected %(expected)s"
+
+
+class ImageChecksumMismatch(ChecksumMismatch):
+    message = ("Data of image %(image_id)s has checksum %(actual)s, "
+               "Glance reported %(expected)s")
+
+
 class IdentityError(TempestException):
     message = "Got identity error"
 
@@ -30,6 +30,7 @@ import novaclient.client
 
 from tempest.api.network import common as net_common
 from tempest.common import ssh
+from tempest.common import teardown
 from tempest.common.utils.data_utils import rand_name
 import tempest.manager
 from tempest.openstack.common import log as logging
@@ -181,39 +182,39 @@ class OfficialClientTest(tempest.test.TestCase):
         # specific order, and because test methods in scenario tests
         # generally create resources in a particular order, we destroy
         # resources in the reverse order in which resources are added to
-        # the scenario test class object
-        while cls.os_resources:
-            thing = cls.os_resources.pop()
-            LOG.debug("Deleting %r from shared resources of %s" %
-                      (thing, cls.__name__))
-
+        # the scenario test class object. Resources of known kinds are
+        # deleted concurrently where their dependencies allow.
+        cleanup = teardown.Teardown(cls.config.http.batch_workers,
+                                    cls.config.compute.build_timeout,
+                                    cls.config.compute.build_interval)
+        for thing in cls.os_resources:
+            cleanup.add('%r from shared resources of %s' %
+                        (thing, cls.__name__), thing.delete,
+                        teardown.resource_kind(thing),
+                        cls._deletion_check(thing))
+        cls.os_resources = []
+        cleanup.run()
+        if cleanup.errors:
+            exc_info = cleanup.errors[0]
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    @staticmethod
+    def _deletion_check(thing):
+        # Deletion testing is only required for objects whose
+        # existence cannot be checked via retrieval.
+        if isinstance(thing, dict):
+            return None
+
+        def is_deletion_complete():
             try:
-                # OpenStack resources are assumed to have a delete()
-                # method which destroys the resource...
-                thing.delete()
+                thing.get()
             except Exception as e:
-                # If the resource is already missing, mission accomplished.
-                if e.__class__.__name__ == 'NotFound':
-                    continue
-                raise
-
-            def is_deletion_complete():
-                # Deletion testing is only required for objects whose
-                # existence cannot be checked via retrieval.
-                if isinstance(thing, dict):
+                if teardown.is_not_found(e):
                     return True
-                try:
-                    thing.get()
-                except Exception as e:
-                    # Clients are expected to return an exception
-                    # called 'NotFound' if retrieval fails.
-                    if e.__class__.__name__ == 'NotFound':
-                        return True
-                    raise
-                return False
+                raise
+            return False
 
-            # Block until resource deletion has completed or timed-out
-            tempest.test.call_until_true(is_deletion_complete, 10, 1)
+        return is_deletion_complete
 
 
 class NetworkScenarioTest(OfficialClientTest):
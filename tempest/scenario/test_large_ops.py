@@ -36,9 +36,9 @@ class TestLargeOpsScenario(manager.OfficialClientTest):
     """
 
     def _wait_for_server_status(self, status):
-        for server in self.servers:
-            self.status_timeout(
-                self.compute_client.servers, server.id, status)
+        self.batch_status_timeout(
+            self.compute_client.servers,
+            [server.id for server in self.servers], status)
 
     def _wait_for_volume_status(self, status):
         volume_id = self.volume.id
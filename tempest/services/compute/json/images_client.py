@@ -16,10 +16,10 @@
 #    under the License.
 
 import json
-import time
 import urllib
 
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -84,30 +84,26 @@ class ImagesClientJSON(RestClient):
         Waits until the HTTP response code for the request matches the
         expected value
         """
-        resp, body = self.get("images/%s" % str(image_id))
-        start = int(time.time())
-
-        while resp.status != code:
-            time.sleep(self.build_interval)
+        def get_status():
             resp, body = self.get("images/%s" % str(image_id))
+            return resp.status
 
-            if int(time.time()) - start >= self.build_timeout:
-                raise exceptions.TimeoutException
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval)
+        if not waiter.wait(get_status, lambda s: s == code):
+            raise exceptions.TimeoutException
 
     def wait_for_image_status(self, image_id, status):
         """Waits for an image to reach a given status."""
-        resp, image = self.get_image(image_id)
-        start = int(time.time())
-
-        while image['status'] != status:
-            time.sleep(self.build_interval)
+        def get_status():
             resp, image = self.get_image(image_id)
-
-            if image['status'] == 'ERROR':
+            if image['status'] == 'ERROR' and status != 'ERROR':
                 raise exceptions.AddImageException(image_id=image_id)
+            return image['status']
 
-            if int(time.time()) - start >= self.build_timeout:
-                raise exceptions.TimeoutException
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'image ' + status)
+        if not waiter.wait(get_status, lambda s: s == status):
+            raise exceptions.TimeoutException
 
     def list_image_metadata(self, image_id):
         """Lists all metadata items for an image."""
@@ -14,9 +14,9 @@
 #    under the License.
 
 import json
-import time
 
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -60,21 +60,15 @@ class InterfacesClientJSON(RestClient):
 
     def wait_for_interface_status(self, server, port_id, status):
         """Waits for a interface to reach a given status."""
-        resp, body = self.show_interface(server, port_id)
-        interface_status = body['port_state']
-        start = int(time.time())
+        def show_interface():
+            return self.show_interface(server, port_id)
 
-        while(interface_status != status):
-            time.sleep(self.build_interval)
-            resp, body = self.show_interface(server, port_id)
-            interface_status = body['port_state']
-
-            timed_out = int(time.time()) - start >= self.build_timeout
-
-            if interface_status != status and timed_out:
-                message = ('Interface %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (port_id, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
-
-        return resp, body
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'interface ' + status)
+        if not waiter.wait(show_interface,
+                           lambda r: r[1]['port_state'] == status):
+            message = ('Interface %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (port_id, status, self.build_timeout))
+            raise exceptions.TimeoutException(message)
+        return waiter.value
@@ -26,14 +26,24 @@ class LimitsClientJSON(RestClient):
                                                auth_url, tenant_name)
         self.service = self.config.compute.catalog_type
 
-    def get_absolute_limits(self):
+    def _get_limits(self):
         resp, body = self.get("limits")
         body = json.loads(body)
+        # Let the shared rate limiter pace requests to this endpoint.
+        self.rate_limiter.learn_limits(self.base_url,
+                                       body['limits'].get('rate', []))
+        return resp, body
+
+    def get_absolute_limits(self):
+        resp, body = self._get_limits()
         return resp, body['limits']['absolute']
 
+    def get_rate_limits(self):
+        resp, body = self._get_limits()
+        return resp, body['limits']['rate']
+
     def get_specific_absolute_limit(self, absolute_limit):
-        resp, body = self.get("limits")
-        body = json.loads(body)
+        resp, body = self._get_limits()
         if absolute_limit not in body['limits']['absolute']:
             return None
         else:
@@ -17,12 +17,18 @@
 #    under the License.
 
 import json
-import time
 import urllib
 
+from tempest.common import pagination
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 
+# Servers per page of the status listings, nova's default osapi_max_limit.
+STATUS_PAGE_SIZE = 1000
+# Times a status listing is started over when its marker was deleted.
+MARKER_RETRIES = 3
+
 
 class ServersClientJSON(RestClient):
 
@@ -152,44 +158,94 @@ class ServersClientJSON(RestClient):
 
     def wait_for_server_status(self, server_id, status):
         """Waits for a server to reach a given status."""
-        resp, body = self.get_server(server_id)
-        server_status = body['status']
-        start = int(time.time())
-
-        while(server_status != status):
-            time.sleep(self.build_interval)
+        def get_status():
             resp, body = self.get_server(server_id)
             server_status = body['status']
-
-            if server_status == 'ERROR':
+            if server_status == 'ERROR' and status != 'ERROR':
                 raise exceptions.BuildErrorException(server_id=server_id)
+            return server_status
 
-            timed_out = int(time.time()) - start >= self.build_timeout
-
-            if server_status != status and timed_out:
-                message = ('Server %s failed to reach %s status within the '
-                           'required time (%s s).' %
-                           (server_id, status, self.build_timeout))
-                message += ' Current status: %s.' % server_status
-                raise exceptions.TimeoutException(message)
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'server %s' % status)
+        if not waiter.wait(get_status, lambda s: s == status):
+            message = ('Server %s failed to reach %s status within the '
+                       'required time (%s s).' %
+                       (server_id, status, self.build_timeout))
+            message += ' Current status: %s.' % waiter.value
+            raise exceptions.TimeoutException(message)
 
     def wait_for_server_termination(self, server_id, ignore_error=False):
         """Waits for server to reach termination."""
-        start_time = int(time.time())
-        while True:
+        def is_deleted():
             try:
                 resp, body = self.get_server(server_id)
             except exceptions.NotFound:
-                return
-
-            server_status = body['status']
-            if server_status == 'ERROR' and not ignore_error:
+                return True
+            if body['status'] == 'ERROR' and not ignore_error:
                 raise exceptions.BuildErrorException(server_id=server_id)
-
-            if int(time.time()) - start_time >= self.build_timeout:
-                raise exceptions.TimeoutException
-
-            time.sleep(self.build_interval)
+            return False
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'server deletion')
+        if not waiter.wait(is_deleted):
+            raise exceptions.TimeoutException
+
+    def _list_server_statuses(self, params):
+        def list_page(marker):
+            page_params = dict(params or {}, limit=STATUS_PAGE_SIZE)
+            if marker is not None:
+                page_params['marker'] = marker
+            resp, body = self.list_servers_with_detail(page_params)
+            return body['servers']
+
+        attempts = MARKER_RETRIES + 1
+        while True:
+            statuses = {}
+            attempts -= 1
+            try:
+                for page in pagination.iter_pages(
+                        list_page, lambda page: page[-1]['id'],
+                        limit=STATUS_PAGE_SIZE):
+                    statuses.update((s['id'], s['status']) for s in page)
+                return statuses
+            except exceptions.BadRequest:
+                # Nova refuses a marker that was deleted since it was
+                # listed, start over unless even the first page failed.
+                if not statuses or not attempts:
+                    raise
+
+    def wait_for_servers_status(self, server_ids, status, params=None):
+        """
+        Waits for several servers to reach a given status, polling the
+        server list once per interval instead of each server.
+        """
+        waiter = waiters.BatchWaiter(
+            lambda: self._list_server_statuses(params),
+            self.build_timeout, self.build_interval, 'server ' + status)
+        if not waiter.wait(server_ids, status,
+                           lambda server_id: exceptions.BuildErrorException(
+                               server_id=server_id)):
+            message = ('Servers %s failed to reach %s status within the '
+                       'required time (%s s).' %
+                       (', '.join(sorted(waiter.pending)), status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
+
+    def wait_for_servers_termination(self, server_ids, ignore_error=False,
+                                     params=None):
+        """Waits for several servers to be deleted."""
+        def error(server_id):
+            return exceptions.BuildErrorException(server_id=server_id)
+
+        waiter = waiters.BatchWaiter(
+            lambda: self._list_server_statuses(params),
+            self.build_timeout, self.build_interval, 'server deletion')
+        if not waiter.wait(server_ids, waiters.DELETED,
+                           None if ignore_error else error):
+            message = ('Servers %s were not deleted within the required '
+                       'time (%s s).' % (', '.join(sorted(waiter.pending)),
+                                         self.build_timeout))
+            raise exceptions.TimeoutException(message)
 
     def list_addresses(self, server_id):
         """Lists all addresses for a server."""
@@ -16,10 +16,10 @@
 #    under the License.
 
 import json
-import time
 import urllib
 
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -85,23 +85,21 @@ class VolumesExtensionsClientJSON(RestClient):
 
     def wait_for_volume_status(self, volume_id, status):
         """Waits for a Volume to reach a given status."""
-        resp, body = self.get_volume(volume_id)
-        volume_name = body['displayName']
-        volume_status = body['status']
-        start = int(time.time())
-
-        while volume_status != status:
-            time.sleep(self.build_interval)
+        def get_volume():
             resp, body = self.get_volume(volume_id)
-            volume_status = body['status']
-            if volume_status == 'error':
-                raise exceptions.VolumeBuildErrorException(volume_id=volume_id)
-
-            if int(time.time()) - start >= self.build_timeout:
-                message = ('Volume %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (volume_name, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
+            if body['status'] == 'error' and status != 'error':
+                raise exceptions.VolumeBuildErrorException(
+                    volume_id=volume_id)
+            return body
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'volume ' + status)
+        if not waiter.wait(get_volume, lambda v: v['status'] == status):
+            message = ('Volume %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (waiter.value['displayName'], status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
 
     def is_resource_deleted(self, id):
         try:
@@ -15,8 +15,34 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import StringIO
+from xml.sax import saxutils
+
+from lxml import etree
+
 XMLNS_11 = "http://docs.openstack.org/compute/api/v1.1"
 
+# Characters escaped in attribute values in addition to &, < and >.
+_ATTR_ENTITIES = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;',
+                  '\t': '&#9;'}
+
+
+def _to_str(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
+
+
+def _escape_attr(value):
+    return saxutils.escape(_to_str(value), _ATTR_ENTITIES)
+
+
+def _serialize(element, out):
+    if isinstance(element, Element):
+        element._serialize(out)
+    else:
+        out.append(_to_str(element))
+
 
 # NOTE(danms): This is just a silly implementation to help make generating
 # XML faster for prototyping. Could be replaced with proper etree gorp
@@ -33,21 +59,29 @@ class Element(object):
     def append(self, element):
         self._elements.append(element)
 
-    def __str__(self):
-        args = " ".join(['%s="%s"' % (k, v) for k, v in self._attrs.items()])
-        string = '<%s %s' % (self.element_name, args)
+    def _start_tag(self):
+        if not self._attrs:
+            return '<%s' % self.element_name
+        attrs = " ".join(['%s="%s"' % (k, _escape_attr(v))
+                          for k, v in self._attrs.items()])
+        return '<%s %s' % (self.element_name, attrs)
+
+    def _serialize(self, out):
+        # Appends the pieces of the document to out, so it is joined once
+        # instead of being concatenated level by level.
+        out.append(self._start_tag())
         if not self._elements:
-            string += '/>'
-            return string
-
-        string += '>'
-
+            out.append('/>')
+            return
+        out.append('>')
         for element in self._elements:
-            string += str(element)
+            _serialize(element, out)
+        out.append('</%s>' % self.element_name)
 
-        string += '</%s>' % self.element_name
-
-        return string
+    def __str__(self):
+        out = []
+        self._serialize(out)
+        return ''.join(out)
 
     def __getitem__(self, name):
         for element in self._elements:
@@ -75,12 +109,12 @@ class Document(Element):
             kwargs['encoding'] = 'UTF-8'
         Element.__init__(self, '?xml', *args, **kwargs)
 
-    def __str__(self):
-        args = " ".join(['%s="%s"' % (k, v) for k, v in self._attrs.items()])
-        string = '<?xml %s?>\n' % args
+    def _serialize(self, out):
+        args = " ".join(['%s="%s"' % (k, _escape_attr(v))
+                         for k, v in self._attrs.items()])
+        out.append('<?xml %s?>\n' % args)
         for element in self._elements:
-            string += str(element)
-        return string
+            _serialize(element, out)
 
 
 class Text(Element):
@@ -88,8 +122,38 @@ class Text(Element):
         Element.__init__(self, None)
         self.__content = content
 
-    def __str__(self):
-        return self.__content
+    def _serialize(self, out):
+        out.append(saxutils.escape(_to_str(self.__content)))
+
+
+def metadata_element(metadata, tag="metadata"):
+    """
+    Returns the <metadata><meta key="k">v</meta>...</metadata> element
+    used by the compute API for metadata, which may be a dict or a list
+    of (key, value) pairs.
+    """
+    if isinstance(metadata, dict):
+        metadata = metadata.items()
+    return Element(tag, *[Element("meta", Text(value), key=key)
+                          for key, value in metadata])
+
+
+def personality_element(personality):
+    """
+    Returns the <personality> element for a list of file dicts with
+    'path' and 'contents'.
+    """
+    return Element("personality", *[Element("file", Text(f['contents']),
+                                            path=f['path'])
+                                    for f in personality])
+
+
+# Listings larger than this are converted while they are parsed, so the
+# whole document tree is never held in memory at once.
+LARGE_BODY = 1024 * 1024
+
+# Tag -> local name; the set of tags in API responses is small.
+_LOCAL_NAMES = {}
 
 
 def xml_to_json(node):
@@ -98,15 +162,61 @@ def xml_to_json(node):
     and json structures are the same, then this "just works". In
     others, it requires a little hand-editing of the result.
     """
-    json = {}
-    for attr in node.keys():
-        if not attr.startswith("xmlns"):
-            json[attr] = node.get(attr)
-    if not node.getchildren():
+    # Namespace declarations are not attributes in lxml, so attrib
+    # holds exactly the attributes to keep.
+    json = dict(node.attrib)
+    if not len(node):
         return node.text or json
-    for child in node.getchildren():
+    # Walk the subtree once, in document order, instead of recursing.
+    # The dict of each element is created when the element is reached
+    # and filled in as its children follow; lxml hands out the same
+    # proxy object for an element while one is referenced, so
+    # getparent() finds it in converted.
+    converted = {node: json}
+    names = _LOCAL_NAMES
+    subtree = node.iter()
+    next(subtree)
+    for child in subtree:
         tag = child.tag
-        if tag.startswith("{"):
-            ns, tag = tag.split("}", 1)
-        json[tag] = xml_to_json(child)
+        name = names.get(tag)
+        if name is None:
+            if not isinstance(tag, basestring):
+                # Comments and processing instructions.
+                continue
+            name = tag.split("}", 1)[1] if tag.startswith("{") else tag
+            names[tag] = name
+        value = dict(child.attrib)
+        if len(child):
+            converted[child] = value
+        else:
+            value = child.text or value
+        converted[child.getparent()][name] = value
     return json
+
+
+def xml_string_to_list(body):
+    """
+    Converts each child of the root element of body with xml_to_json,
+    for listings such as a list of servers. Large bodies are converted
+    one child at a time while they are parsed.
+    """
+    if len(body) < LARGE_BODY:
+        return [xml_to_json(child) for child in etree.fromstring(body)
+                if isinstance(child.tag, basestring)]
+    if isinstance(body, unicode):
+        body = body.encode('utf-8')
+    items = []
+    depth = 0
+    for event, elem in etree.iterparse(StringIO.StringIO(body),
+                                       events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            items.append(xml_to_json(elem))
+            elem.clear()
+            # clear() keeps the emptied element, drop it as well.
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    return items
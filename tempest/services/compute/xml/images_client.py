@@ -15,15 +15,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
 import urllib
 
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.services.compute.xml.common import Document
 from tempest.services.compute.xml.common import Element
+from tempest.services.compute.xml.common import metadata_element
 from tempest.services.compute.xml.common import Text
 from tempest.services.compute.xml.common import xml_to_json
 from tempest.services.compute.xml.common import XMLNS_11
@@ -95,12 +96,7 @@ class ImagesClientXML(RestClientXML):
         post_body = Element('createImage', name=name)
 
         if meta:
-            metadata = Element('metadata')
-            post_body.append(metadata)
-            for k, v in meta.items():
-                data = Element('meta', key=k)
-                data.append(Text(v))
-                metadata.append(data)
+            post_body.append(metadata_element(meta))
         resp, body = self.post('servers/%s/action' % str(server_id),
                                str(Document(post_body)), self.headers)
         return resp, body
@@ -142,37 +138,29 @@ class ImagesClientXML(RestClientXML):
         Waits until the HTTP response code for the request matches the
         expected value
         """
-        resp, body = self.get("images/%s" % str(image_id), self.headers)
-        start = int(time.time())
-
-        while resp.status != code:
-            time.sleep(self.build_interval)
+        def get_status():
             resp, body = self.get("images/%s" % str(image_id), self.headers)
+            return resp.status
 
-            if int(time.time()) - start >= self.build_timeout:
-                raise exceptions.TimeoutException
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval)
+        if not waiter.wait(get_status, lambda s: s == code):
+            raise exceptions.TimeoutException
 
     def wait_for_image_status(self, image_id, status):
         """Waits for an image to reach a given status."""
-        resp, image = self.get_image(image_id)
-        start = int(time.time())
-
-        while image['status'] != status:
-            time.sleep(self.build_interval)
+        def get_status():
             resp, image = self.get_image(image_id)
-            if image['status'] == 'ERROR':
+            if image['status'] == 'ERROR' and status != 'ERROR':
                 raise exceptions.AddImageException(image_id=image_id)
+            return image['status']
 
-            if int(time.time()) - start >= self.build_timeout:
-                raise exceptions.TimeoutException
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'image ' + status)
+        if not waiter.wait(get_status, lambda s: s == status):
+            raise exceptions.TimeoutException
 
     def _metadata_body(self, meta):
-        post_body = Element('metadata')
-        for k, v in meta.items():
-            data = Element('meta', key=k)
-            data.append(Text(v))
-            post_body.append(data)
-        return post_body
+        return metadata_element(meta)
 
     def list_image_metadata(self, image_id):
         """Lists all metadata items for an image."""
@@ -13,11 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
 
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.services.compute.xml.common import Document
 from tempest.services.compute.xml.common import Element
@@ -86,20 +86,15 @@ class InterfacesClientXML(RestClientXML):
 
     def wait_for_interface_status(self, server, port_id, status):
         """Waits for a interface to reach a given status."""
-        resp, body = self.show_interface(server, port_id)
-        interface_status = body['port_state']
-        start = int(time.time())
+        def show_interface():
+            return self.show_interface(server, port_id)
 
-        while(interface_status != status):
-            time.sleep(self.build_interval)
-            resp, body = self.show_interface(server, port_id)
-            interface_status = body['port_state']
-
-            timed_out = int(time.time()) - start >= self.build_timeout
-
-            if interface_status != status and timed_out:
-                message = ('Interface %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (port_id, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
-        return resp, body
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'interface ' + status)
+        if not waiter.wait(show_interface,
+                           lambda r: r[1]['port_state'] == status):
+            message = ('Interface %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (port_id, status, self.build_timeout))
+            raise exceptions.TimeoutException(message)
+        return waiter.value
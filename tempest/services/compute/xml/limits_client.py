@@ -29,9 +29,27 @@ class LimitsClientXML(RestClientXML):
                                               auth_url, tenant_name)
         self.service = self.config.compute.catalog_type
 
-    def get_absolute_limits(self):
+    def _get_limits(self):
         resp, body = self.get("limits", self.headers)
         body = objectify.fromstring(body)
+        # Let the shared rate limiter pace requests to this endpoint.
+        self.rate_limiter.learn_limits(self.base_url,
+                                       self._parse_rate_limits(body))
+        return resp, body
+
+    def _parse_rate_limits(self, body):
+        rates = []
+        if not hasattr(body, NS + 'rates'):
+            return rates
+        for rate in body[NS + 'rates'].iterchildren():
+            rates.append({'uri': rate.get('uri'),
+                          'regex': rate.get('regex'),
+                          'limit': [dict(limit.attrib)
+                                    for limit in rate.iterchildren()]})
+        return rates
+
+    def get_absolute_limits(self):
+        resp, body = self._get_limits()
         lim = NS + 'absolute'
         ret = {}
 
@@ -40,9 +58,12 @@ class LimitsClientXML(RestClientXML):
             ret[attributes['name']] = attributes['value']
         return resp, ret
 
+    def get_rate_limits(self):
+        resp, body = self._get_limits()
+        return resp, self._parse_rate_limits(body)
+
     def get_specific_absolute_limit(self, absolute_limit):
-        resp, body = self.get("limits", self.headers)
-        body = objectify.fromstring(body)
+        resp, body = self._get_limits()
         lim = NS + 'absolute'
         ret = {}
 
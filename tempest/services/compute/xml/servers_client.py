@@ -16,23 +16,32 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
 import urllib
 
 from lxml import etree
 
+from tempest.common import pagination
 from tempest.common.rest_client import RestClientXML
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.openstack.common import log as logging
 from tempest.services.compute.xml.common import Document
 from tempest.services.compute.xml.common import Element
+from tempest.services.compute.xml.common import metadata_element
+from tempest.services.compute.xml.common import personality_element
 from tempest.services.compute.xml.common import Text
+from tempest.services.compute.xml.common import xml_string_to_list
 from tempest.services.compute.xml.common import xml_to_json
 from tempest.services.compute.xml.common import XMLNS_11
 
 
 LOG = logging.getLogger(__name__)
 
+# Servers per page of the status listings, nova's default osapi_max_limit.
+STATUS_PAGE_SIZE = 1000
+# Times a status listing is started over when its marker was deleted.
+MARKER_RETRIES = 3
+
 
 def _translate_ip_xml_json(ip):
     """
@@ -195,7 +204,7 @@ class ServersClientXML(RestClientXML):
             url += '?%s' % urllib.urlencode(params)
 
         resp, body = self.get(url, self.headers)
-        servers = self._parse_array(etree.fromstring(body))
+        servers = xml_string_to_list(body)
         return resp, {"servers": servers}
 
     def list_servers_with_detail(self, params=None):
@@ -204,7 +213,7 @@ class ServersClientXML(RestClientXML):
             url += '?%s' % urllib.urlencode(params)
 
         resp, body = self.get(url, self.headers)
-        servers = self._parse_array(etree.fromstring(body))
+        servers = xml_string_to_list(body)
         return resp, {"servers": servers}
 
     def update_server(self, server_id, name=None, meta=None, accessIPv4=None,
@@ -220,12 +229,7 @@ class ServersClientXML(RestClientXML):
         if accessIPv6 is not None:
             server.add_attr("accessIPv6", accessIPv6)
         if meta is not None:
-            metadata = Element("metadata")
-            server.append(metadata)
-            for k, v in meta:
-                meta = Element("meta", key=k)
-                meta.append(Text(v))
-                metadata.append(meta)
+            server.append(metadata_element(meta))
 
         resp, body = self.put('servers/%s' % str(server_id),
                               str(doc), self.headers)
@@ -286,20 +290,10 @@ class ServersClientXML(RestClientXML):
                 networks.append(s)
 
         if 'meta' in kwargs:
-            metadata = Element("metadata")
-            server.append(metadata)
-            for k, v in kwargs['meta'].items():
-                meta = Element("meta", key=k)
-                meta.append(Text(v))
-                metadata.append(meta)
+            server.append(metadata_element(kwargs['meta']))
 
         if 'personality' in kwargs:
-            personality = Element('personality')
-            server.append(personality)
-            for k in kwargs['personality']:
-                temp = Element('file', path=k['path'])
-                temp.append(Text(k['contents']))
-                personality.append(temp)
+            server.append(personality_element(kwargs['personality']))
 
         resp, body = self.post('servers', str(Document(server)), self.headers)
         server = self._parse_server(etree.fromstring(body))
@@ -307,44 +301,94 @@ class ServersClientXML(RestClientXML):
 
     def wait_for_server_status(self, server_id, status):
         """Waits for a server to reach a given status."""
-        resp, body = self.get_server(server_id)
-        server_status = body['status']
-        start = int(time.time())
-
-        while(server_status != status):
-            time.sleep(self.build_interval)
+        def get_status():
             resp, body = self.get_server(server_id)
             server_status = body['status']
-
-            if server_status == 'ERROR':
+            if server_status == 'ERROR' and status != 'ERROR':
                 raise exceptions.BuildErrorException(server_id=server_id)
+            return server_status
 
-            timed_out = int(time.time()) - start >= self.build_timeout
-
-            if server_status != status and timed_out:
-                message = ('Server %s failed to reach %s status within the '
-                           'required time (%s s).' %
-                           (server_id, status, self.build_timeout))
-                message += ' Current status: %s.' % server_status
-                raise exceptions.TimeoutException(message)
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'server %s' % status)
+        if not waiter.wait(get_status, lambda s: s == status):
+            message = ('Server %s failed to reach %s status within the '
+                       'required time (%s s).' %
+                       (server_id, status, self.build_timeout))
+            message += ' Current status: %s.' % waiter.value
+            raise exceptions.TimeoutException(message)
 
     def wait_for_server_termination(self, server_id, ignore_error=False):
         """Waits for server to reach termination."""
-        start_time = int(time.time())
-        while True:
+        def is_deleted():
             try:
                 resp, body = self.get_server(server_id)
             except exceptions.NotFound:
-                return
-
-            server_status = body['status']
-            if server_status == 'ERROR' and not ignore_error:
-                raise exceptions.BuildErrorException
-
-            if int(time.time()) - start_time >= self.build_timeout:
-                raise exceptions.TimeoutException
-
-            time.sleep(self.build_interval)
+                return True
+            if body['status'] == 'ERROR' and not ignore_error:
+                raise exceptions.BuildErrorException(server_id=server_id)
+            return False
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'server deletion')
+        if not waiter.wait(is_deleted):
+            raise exceptions.TimeoutException
+
+    def _list_server_statuses(self, params):
+        def list_page(marker):
+            page_params = dict(params or {}, limit=STATUS_PAGE_SIZE)
+            if marker is not None:
+                page_params['marker'] = marker
+            resp, body = self.list_servers_with_detail(page_params)
+            return body['servers']
+
+        attempts = MARKER_RETRIES + 1
+        while True:
+            statuses = {}
+            attempts -= 1
+            try:
+                for page in pagination.iter_pages(
+                        list_page, lambda page: page[-1]['id'],
+                        limit=STATUS_PAGE_SIZE):
+                    statuses.update((s['id'], s['status']) for s in page)
+                return statuses
+            except exceptions.BadRequest:
+                # Nova refuses a marker that was deleted since it was
+                # listed, start over unless even the first page failed.
+                if not statuses or not attempts:
+                    raise
+
+    def wait_for_servers_status(self, server_ids, status, params=None):
+        """
+        Waits for several servers to reach a given status, polling the
+        server list once per interval instead of each server.
+        """
+        waiter = waiters.BatchWaiter(
+            lambda: self._list_server_statuses(params),
+            self.build_timeout, self.build_interval, 'server ' + status)
+        if not waiter.wait(server_ids, status,
+                           lambda server_id: exceptions.BuildErrorException(
+                               server_id=server_id)):
+            message = ('Servers %s failed to reach %s status within the '
+                       'required time (%s s).' %
+                       (', '.join(sorted(waiter.pending)), status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
+
+    def wait_for_servers_termination(self, server_ids, ignore_error=False,
+                                     params=None):
+        """Waits for several servers to be deleted."""
+        def error(server_id):
+            return exceptions.BuildErrorException(server_id=server_id)
+
+        waiter = waiters.BatchWaiter(
+            lambda: self._list_server_statuses(params),
+            self.build_timeout, self.build_interval, 'server deletion')
+        if not waiter.wait(server_ids, waiters.DELETED,
+                           None if ignore_error else error):
+            message = ('Servers %s were not deleted within the required '
+                       'time (%s s).' % (', '.join(sorted(waiter.pending)),
+                                         self.build_timeout))
+            raise exceptions.TimeoutException(message)
 
     def _parse_network(self, node):
         addrs = []
@@ -409,12 +453,7 @@ class ServersClientXML(RestClientXML):
                           **attrs)
 
         if 'metadata' in kwargs:
-            metadata = Element("metadata")
-            rebuild.append(metadata)
-            for k, v in kwargs['metadata'].items():
-                meta = Element("meta", key=k)
-                meta.append(Text(v))
-                metadata.append(meta)
+            rebuild.append(metadata_element(kwargs['metadata']))
 
         resp, body = self.post('servers/%s/action' % server_id,
                                str(Document(rebuild)), self.headers)
@@ -472,25 +511,13 @@ class ServersClientXML(RestClientXML):
         return resp, body
 
     def set_server_metadata(self, server_id, meta):
-        doc = Document()
-        metadata = Element("metadata")
-        doc.append(metadata)
-        for k, v in meta.items():
-            meta_element = Element("meta", key=k)
-            meta_element.append(Text(v))
-            metadata.append(meta_element)
+        doc = Document(metadata_element(meta))
         resp, body = self.put('servers/%s/metadata' % str(server_id),
                               str(doc), self.headers)
         return resp, xml_to_json(etree.fromstring(body))
 
     def update_server_metadata(self, server_id, meta):
-        doc = Document()
-        metadata = Element("metadata")
-        doc.append(metadata)
-        for k, v in meta.items():
-            meta_element = Element("meta", key=k)
-            meta_element.append(Text(v))
-            metadata.append(meta_element)
+        doc = Document(metadata_element(meta))
         resp, body = self.post("/servers/%s/metadata" % str(server_id),
                                str(doc), headers=self.headers)
         body = xml_to_json(etree.fromstring(body))
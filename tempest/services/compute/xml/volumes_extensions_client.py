@@ -15,16 +15,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
 import urllib
 
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.services.compute.xml.common import Document
 from tempest.services.compute.xml.common import Element
-from tempest.services.compute.xml.common import Text
+from tempest.services.compute.xml.common import metadata_element
 from tempest.services.compute.xml.common import xml_to_json
 from tempest.services.compute.xml.common import XMLNS_11
 
@@ -102,13 +102,7 @@ class VolumesExtensionsClientXML(RestClientXML):
             volume.add_attr('display_name', display_name)
 
         if metadata:
-            _metadata = Element('metadata')
-            volume.append(_metadata)
-            for key, value in metadata.items():
-                meta = Element('meta')
-                meta.add_attr('key', key)
-                meta.append(Text(value))
-                _metadata.append(meta)
+            volume.append(metadata_element(metadata))
 
         resp, body = self.post('os-volumes', str(Document(volume)),
                                self.headers)
@@ -121,23 +115,21 @@ class VolumesExtensionsClientXML(RestClientXML):
 
     def wait_for_volume_status(self, volume_id, status):
         """Waits for a Volume to reach a given status."""
-        resp, body = self.get_volume(volume_id)
-        volume_name = body['displayName']
-        volume_status = body['status']
-        start = int(time.time())
-
-        while volume_status != status:
-            time.sleep(self.build_interval)
+        def get_volume():
             resp, body = self.get_volume(volume_id)
-            volume_status = body['status']
-            if volume_status == 'error':
-                raise exceptions.VolumeBuildErrorException(volume_id=volume_id)
-
-            if int(time.time()) - start >= self.build_timeout:
-                message = 'Volume %s failed to reach %s status within '\
-                          'the required time (%s s).' % (volume_name, status,
-                                                         self.build_timeout)
-                raise exceptions.TimeoutException(message)
+            if body['status'] == 'error' and status != 'error':
+                raise exceptions.VolumeBuildErrorException(
+                    volume_id=volume_id)
+            return body
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'volume ' + status)
+        if not waiter.wait(get_volume, lambda v: v['status'] == status):
+            message = ('Volume %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (waiter.value['displayName'], status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
 
     def is_resource_deleted(self, id):
         try:
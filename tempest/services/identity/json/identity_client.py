@@ -12,9 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import httplib2
 import json
 
+from tempest.common import http
 from tempest.common.rest_client import RestClient
 from tempest import exceptions
 
@@ -241,6 +241,7 @@ class TokenClientJSON(RestClient):
 
         self.auth_url = auth_url
         self.config = config
+        self.http_obj = http.get_http(config)
 
     def auth(self, user, password, tenant):
         creds = {
@@ -259,8 +260,6 @@ class TokenClientJSON(RestClient):
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
         if headers is None:
             headers = {}
 
@@ -16,7 +16,6 @@
 #    under the License.
 import urlparse
 
-import httplib2
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
@@ -49,8 +48,6 @@ class EndPointClientXML(RestClientXML):
 
     def request(self, method, url, headers=None, body=None, wait=None):
         """Overriding the existing HTTP request in super class RestClient."""
-        dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
         self._set_auth()
         self.base_url = self.base_url.replace(
             urlparse.urlparse(self.base_url).path, "/v3")
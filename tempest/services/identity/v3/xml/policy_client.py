@@ -17,7 +17,6 @@
 
 from urlparse import urlparse
 
-import httplib2
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
@@ -50,8 +49,6 @@ class PolicyClientXML(RestClientXML):
 
     def request(self, method, url, headers=None, body=None, wait=None):
         """Overriding the existing HTTP request in super class RestClient."""
-        dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
         self._set_auth()
         self.base_url = self.base_url.replace(urlparse(self.base_url).path,
                                               "/v3")
@@ -24,6 +24,7 @@ import urllib
 
 from tempest.common import glance_http
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.openstack.common import log as logging
 
@@ -36,7 +37,15 @@ class ImageClientJSON(RestClient):
         super(ImageClientJSON, self).__init__(config, username, password,
                                               auth_url, tenant_name)
         self.service = self.config.images.catalog_type
-        self.http = self._get_http()
+        self._http = None
+
+    @property
+    def http(self):
+        # Only authenticate against the image endpoint once data actually
+        # has to be streamed through glance_http.
+        if self._http is None:
+            self._http = self._get_http()
+        return self._http
 
     def _image_meta_from_headers(self, headers):
         meta = {'properties': {}}
@@ -111,23 +120,32 @@ class ImageClientJSON(RestClient):
                                              self.tenant_name)
         dscv = self.config.identity.disable_ssl_certificate_validation
         return glance_http.HTTPClient(endpoint=endpoint, token=token,
-                                      insecure=dscv)
+                                      insecure=dscv,
+                                      request_log=self.request_log,
+                                      metrics=self.metrics,
+                                      connection_pool=self.http_obj.pool,
+                                      chunk_size=self.config.images.chunk_size)
 
     def _create_with_data(self, headers, data):
+        checksum = glance_http.ChecksumWriter()
         resp, body_iter = self.http.raw_request('POST', '/v1/images',
-                                                headers=headers, body=data)
+                                                headers=headers, body=data,
+                                                checksum=checksum)
         self._error_checker('POST', '/v1/images', headers, data, resp,
                             body_iter)
         body = json.loads(''.join([c for c in body_iter]))
+        checksum.verify(body['image']['id'], body['image'].get('checksum'))
         return resp, body['image']
 
     def _update_with_data(self, image_id, headers, data):
         url = '/v1/images/%s' % image_id
+        checksum = glance_http.ChecksumWriter()
         resp, body_iter = self.http.raw_request('PUT', url, headers=headers,
-                                                body=data)
+                                                body=data, checksum=checksum)
         self._error_checker('PUT', url, headers, data,
                             resp, body_iter)
         body = json.loads(''.join([c for c in body_iter]))
+        checksum.verify(image_id, body['image'].get('checksum'))
         return resp, body['image']
 
     def create_image(self, name, container_format, disk_format, **kwargs):
@@ -208,6 +226,26 @@ class ImageClientJSON(RestClient):
         resp, body = self.get(url)
         return resp, body
 
+    def download_image(self, image_id, dest=None, algorithms=(),
+                       verify=True):
+        """
+        Streams the data of an image into dest, a file-like object, or
+        discards it if dest is None. The data is hashed as it arrives
+        and, with verify, checked against the checksum Glance reports.
+
+        :returns: the response and a glance_http.ChecksumWriter holding
+            the size and checksums of the data.
+        """
+        url = '/v1/images/%s' % image_id
+        resp, body_iter = self.http.raw_request('GET', url)
+        self._error_checker('GET', url, {}, None, resp, body_iter)
+        data = glance_http.ChecksumWriter(dest, algorithms)
+        for chunk in body_iter:
+            data.write(chunk)
+        if verify:
+            data.verify(image_id, resp.getheader('x-image-meta-checksum'))
+        return resp, data
+
     def is_resource_deleted(self, id):
         try:
             self.get_image(id)
@@ -257,23 +295,23 @@ class ImageClientJSON(RestClient):
     def wait_for_image_status(self, image_id, status):
         """Waits for a Image to reach a given status."""
         start_time = time.time()
-        old_value = value = self._get_image_status(image_id)
-        while True:
-            dtime = time.time() - start_time
-            time.sleep(self.build_interval)
-            if value != old_value:
-                LOG.info('Value transition from "%s" to "%s"'
-                         'in %d second(s).', old_value,
-                         value, dtime)
-            if (value == status):
-                return value
-
-            if dtime > self.build_timeout:
-                message = ('Time Limit Exceeded! (%ds)'
-                           'while waiting for %s, '
-                           'but we got %s.' %
-                           (self.build_timeout, status, value))
-                raise exceptions.TimeoutException(message)
-            time.sleep(self.build_interval)
-            old_value = value
+        values = []
+
+        def get_status():
             value = self._get_image_status(image_id)
+            if values and value != values[-1]:
+                LOG.info('Value transition from "%s" to "%s"'
+                         'in %d second(s).', values[-1],
+                         value, time.time() - start_time)
+            values.append(value)
+            return value
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'image ' + status)
+        if not waiter.wait(get_status, lambda v: v == status):
+            message = ('Time Limit Exceeded! (%ds)'
+                       'while waiting for %s, '
+                       'but we got %s.' %
+                       (self.build_timeout, status, waiter.value))
+            raise exceptions.TimeoutException(message)
+        return waiter.value
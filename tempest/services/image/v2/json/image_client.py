@@ -16,6 +16,8 @@
 #    under the License.
 
 import json
+import threading
+import time
 import urllib
 
 import jsonschema
@@ -24,6 +26,11 @@ from tempest.common import glance_http
 from tempest.common import rest_client
 from tempest import exceptions
 
+# (endpoint, schema name) -> dict of the compiled validator, its ETag and
+# when it was last checked, shared by every client of the process.
+_SCHEMAS = {}
+_SCHEMAS_LOCK = threading.Lock()
+
 
 class ImageClientV2JSON(rest_client.RestClient):
 
@@ -31,7 +38,15 @@ class ImageClientV2JSON(rest_client.RestClient):
         super(ImageClientV2JSON, self).__init__(config, username, password,
                                                 auth_url, tenant_name)
         self.service = self.config.images.catalog_type
-        self.http = self._get_http()
+        self._http = None
+
+    @property
+    def http(self):
+        # Only authenticate against the image endpoint once data actually
+        # has to be streamed through glance_http.
+        if self._http is None:
+            self._http = self._get_http()
+        return self._http
 
     def _get_http(self):
         token, endpoint = self.keystone_auth(self.user, self.password,
@@ -39,7 +54,11 @@ class ImageClientV2JSON(rest_client.RestClient):
                                              self.tenant_name)
         dscv = self.config.identity.disable_ssl_certificate_validation
         return glance_http.HTTPClient(endpoint=endpoint, token=token,
-                                      insecure=dscv)
+                                      insecure=dscv,
+                                      request_log=self.request_log,
+                                      metrics=self.metrics,
+                                      connection_pool=self.http_obj.pool,
+                                      chunk_size=self.config.images.chunk_size)
 
     def get_images_schema(self):
         url = 'v2/schemas/images'
@@ -53,15 +72,43 @@ class ImageClientV2JSON(rest_client.RestClient):
         body = json.loads(body)
         return resp, body
 
-    def _validate_schema(self, body, type='image'):
-        if type == 'image':
-            resp, schema = self.get_image_schema()
-        elif type == 'images':
-            resp, schema = self.get_images_schema()
+    def _get_schema_validator(self, type):
+        """
+        Returns a validator for the schema, fetched and compiled once per
+        endpoint. The cached schema is revalidated with its ETag once it
+        is older than the configured schema_cache_ttl.
+        """
+        if self.base_url is None:
+            self._set_auth()
+        key = (self.base_url, type)
+        with _SCHEMAS_LOCK:
+            cached = _SCHEMAS.get(key)
+        now = time.time()
+        if cached is not None and \
+                now - cached['checked'] < self.config.images.schema_cache_ttl:
+            return cached['validator']
+
+        headers = {}
+        if cached is not None and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        resp, body = self.get('v2/schemas/%s' % type, headers)
+        if resp.status == 304:
+            entry = dict(cached, checked=now)
         else:
+            schema = json.loads(body)
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            entry = {'validator': cls(schema), 'etag': resp.get('etag'),
+                     'checked': now}
+        with _SCHEMAS_LOCK:
+            _SCHEMAS[key] = entry
+        return entry['validator']
+
+    def _validate_schema(self, body, type='image'):
+        if type not in ('image', 'images'):
             raise ValueError("%s is not a valid schema type" % type)
 
-        jsonschema.validate(body, schema)
+        self._get_schema_validator(type).validate(body)
 
     def create_image(self, name, container_format, disk_format, **kwargs):
         params = {
@@ -113,14 +160,43 @@ class ImageClientV2JSON(rest_client.RestClient):
             return True
         return False
 
-    def store_image(self, image_id, data):
+    def store_image(self, image_id, data, verify=False):
+        """
+        Uploads data, a string or file-like object, hashing it as it is
+        sent. With verify, the image metadata is then fetched and the
+        checksum Glance reports in it is checked.
+        """
         url = 'v2/images/%s/file' % image_id
         headers = {'Content-Type': 'application/octet-stream'}
+        checksum = glance_http.ChecksumWriter()
         resp, body = self.http.raw_request('PUT', url, headers=headers,
-                                           body=data)
+                                           body=data, checksum=checksum)
+        if verify and resp.status < 300:
+            __, image = self.get_image_metadata(image_id)
+            checksum.verify(image_id, image.get('checksum'))
         return resp, body
 
     def get_image_file(self, image_id):
         url = 'v2/images/%s/file' % image_id
         resp, body = self.get(url)
         return resp, body
+
+    def download_image_file(self, image_id, dest=None, algorithms=(),
+                            verify=True):
+        """
+        Streams the data of an image into dest, a file-like object, or
+        discards it if dest is None. The data is hashed as it arrives
+        and, with verify, checked against the Content-MD5 Glance sends.
+
+        :returns: the response and a glance_http.ChecksumWriter holding
+            the size and checksums of the data.
+        """
+        url = 'v2/images/%s/file' % image_id
+        resp, body_iter = self.http.raw_request('GET', url)
+        self._error_checker('GET', url, {}, None, resp, body_iter)
+        data = glance_http.ChecksumWriter(dest, algorithms)
+        for chunk in body_iter:
+            data.write(chunk)
+        if verify:
+            data.verify(image_id, resp.getheader('content-md5'))
+        return resp, data
@@ -121,6 +121,12 @@ class NetworkClient(RestClient):
         body = json.loads(body)
         return resp, body
 
+    def list_routers(self):
+        uri = '%s/routers' % (self.uri_prefix)
+        resp, body = self.get(uri, self.headers)
+        body = json.loads(body)
+        return resp, body
+
     def show_port(self, port_id):
         uri = '%s/ports/%s' % (self.uri_prefix, port_id)
         resp, body = self.get(uri, self.headers)
@@ -15,11 +15,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import httplib2
 import json
 import urllib
 
+from tempest.common import pagination
 from tempest.common.rest_client import RestClient
+from tempest.common.utils.data_utils import utf8
 from tempest import exceptions
 
 
@@ -86,12 +87,42 @@ class AccountClient(RestClient):
 
         url = '?format=%s' % self.format
         if params:
-            url += '&%s' + urllib.urlencode(params)
+            url += '&%s' % urllib.urlencode(params)
 
         resp, body = self.get(url)
         body = json.loads(body)
         return resp, body
 
+    def list_account_container_pages(self, params=None, prefetch=False):
+        """
+        Yields the container listing of the account page by page,
+        following markers until every container was listed. A 'marker'
+        in params is where the listing starts and a 'limit' the page
+        size. With prefetch each page is requested while the previous
+        one is being processed.
+        """
+        params = dict(params or {})
+        limit = params.get('limit')
+
+        def list_page(marker):
+            page_params = dict(params)
+            if marker is not None:
+                page_params['marker'] = utf8(marker)
+            resp, body = self.list_account_containers(page_params)
+            return body
+
+        return pagination.iter_pages(list_page,
+                                     lambda page: page[-1]['name'],
+                                     params.get('marker'),
+                                     int(limit) if limit else None, prefetch)
+
+    def list_all_account_containers(self, params=None):
+        """Returns the complete list of containers of the account."""
+        containers = []
+        for page in self.list_account_container_pages(params):
+            containers.extend(page)
+        return containers
+
 
 class AccountClientCustomizedHeader(RestClient):
 
@@ -105,7 +136,6 @@ class AccountClientCustomizedHeader(RestClient):
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        self.http_obj = httplib2.Http()
         if headers is None:
             headers = {}
         if self.base_url is None:
@@ -147,7 +177,7 @@ class AccountClientCustomizedHeader(RestClient):
 
         url = '?format=%s' % self.format
         if params:
-            url += '&%s' + urllib.urlencode(params)
+            url += '&%s' % urllib.urlencode(params)
 
         headers = {}
         if metadata:
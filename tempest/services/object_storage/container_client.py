@@ -18,7 +18,15 @@
 import json
 import urllib
 
+from tempest.common import pagination
 from tempest.common.rest_client import RestClient
+from tempest.common.utils.data_utils import utf8
+
+
+def _last_name(page):
+    # Entries of a listing with a delimiter may be subdirectories.
+    last = page[-1]
+    return last.get('name', last.get('subdir'))
 
 
 class ContainerClient(RestClient):
@@ -94,37 +102,32 @@ class ContainerClient(RestClient):
             item count is beyond 10,000 item listing limit.
             Does not require any paramaters aside from container name.
         """
-        #TODO(dwalleck):  Rewite using json format to avoid newlines at end of
-        #obj names. Set limit to API limit - 1 (max returned items = 9999)
-        limit = 9999
-        if params is not None:
-            if 'limit' in params:
-                limit = params['limit']
-
-            if 'marker' in params:
-                limit = params['marker']
-
-        resp, objlist = self.list_container_contents(container,
-                                                     params={'limit': limit})
+        objlist = []
+        for page in self.list_container_pages(container, params):
+            objlist.extend(page)
         return objlist
-        """tmp = []
-        for obj in objlist:
-            tmp.append(obj['name'])
-        objlist = tmp
-
-        if len(objlist) >= limit:
-
-            #Increment marker
-            marker = objlist[len(objlist) - 1]
-
-            #Get the next chunk of the list
-            objlist.extend(_list_all_container_objects(container,
-                                                      params={'marker': marker,
-                                                              'limit': limit}))
-            return objlist
-        else:
-            #Return final, complete list
-            return objlist"""
+
+    def list_container_pages(self, container, params=None, prefetch=False):
+        """
+        Yields the object listing of a container page by page, following
+        markers until every object was listed. params are passed on to
+        list_container_contents, a 'marker' in them is where the listing
+        starts and a 'limit' the page size. With prefetch each page is
+        requested while the previous one is being processed.
+        """
+        params = dict(params or {})
+        limit = params.get('limit')
+
+        def list_page(marker):
+            page_params = dict(params)
+            if marker is not None:
+                page_params['marker'] = utf8(marker)
+            resp, body = self.list_container_contents(container, page_params)
+            return body
+
+        return pagination.iter_pages(list_page, _last_name,
+                                     params.get('marker'),
+                                     int(limit) if limit else None, prefetch)
 
     def list_container_contents(self, container, params=None):
         """
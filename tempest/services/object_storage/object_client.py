@@ -17,11 +17,35 @@
 
 import hashlib
 import hmac
-import httplib2
+import itertools
+import json
+import StringIO
+import threading
+import urllib
 import urlparse
 
+from tempest.common import pagination
 from tempest.common.rest_client import RestClient
+from tempest.common.utils.data_utils import utf8
 from tempest import exceptions
+from tempest.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Size of the ranges download_large_object fetches a plain object in.
+RANGE_SIZE = 16 * 1024 * 1024
+
+
+def _retry(func, retries, what):
+    """Calls func(), calling it again up to retries times if it raises."""
+    for attempt in itertools.count():
+        try:
+            return func()
+        except Exception:
+            if attempt >= retries:
+                raise
+            LOG.warning("Retrying %s after failed attempt %d", what,
+                        attempt + 1, exc_info=True)
 
 
 class ObjectClient(RestClient):
@@ -30,9 +54,15 @@ class ObjectClient(RestClient):
                                            auth_url, tenant_name)
 
         self.service = self.config.object_storage.catalog_type
+        # Whether the cluster has the bulk-delete middleware, None until
+        # the first bulk delete tells.
+        self.bulk_delete = None
 
     def create_object(self, container, object_name, data):
-        """Create storage object."""
+        """
+        Create storage object. data may be a string, a file-like object
+        or an iterator of strings; the latter two are streamed.
+        """
 
         headers = dict(self.headers)
         if not data:
@@ -70,11 +100,20 @@ class ObjectClient(RestClient):
         resp, body = self.head(url)
         return resp, body
 
-    def get_object(self, container, object_name):
-        """Retrieve object's data."""
+    def get_object(self, container, object_name, stream=False,
+                   byte_range=None):
+        """
+        Retrieve object's data. With stream, the data is returned as an
+        iterator of chunks read from the connection as it is consumed.
+        byte_range is an optional (first, last) pair of byte offsets,
+        both included, to retrieve only part of the data.
+        """
 
         url = "{0}/{1}".format(container, object_name)
-        resp, body = self.get(url)
+        headers = None
+        if byte_range is not None:
+            headers = {'Range': 'bytes=%d-%d' % byte_range}
+        resp, body = self.get(url, headers=headers, stream=stream)
         return resp, body
 
     def copy_object_in_same_container(self, container, src_object_name,
@@ -142,12 +181,288 @@ class ObjectClient(RestClient):
         resp, body = self.get(url)
         return resp, body
 
+    def _object_pages(self, container, params=None, prefetch=False):
+        """Yields the JSON object listing of container page by page."""
+        def list_page(marker):
+            page_params = dict(params or {}, format='json')
+            if marker is not None:
+                page_params['marker'] = utf8(marker)
+            resp, body = self.get('%s?%s' % (container,
+                                             urllib.urlencode(page_params)))
+            return json.loads(body)
+
+        return pagination.iter_pages(list_page,
+                                     lambda page: page[-1]['name'],
+                                     prefetch=prefetch)
+
+    def _bulk_delete(self, container, names):
+        """
+        Deletes names from container with one request to the bulk-delete
+        middleware. Returns the numbers of objects deleted and not found,
+        or None if the cluster does not have the middleware.
+        """
+        paths = [urllib.quote('/%s/%s' % (container, utf8(name)))
+                 for name in names]
+        headers = {'Content-Type': 'text/plain', 'Accept': 'application/json'}
+        resp, body = self.post('?bulk-delete', '\n'.join(paths), headers)
+        try:
+            result = json.loads(body)
+            deleted = result['Number Deleted']
+        except (ValueError, TypeError, KeyError):
+            # Without the middleware the request is a no-op account POST.
+            return None
+        if result.get('Errors'):
+            raise exceptions.RestClientException(
+                "Bulk delete from %s failed: %s %s" %
+                (container, result.get('Response Status'), result['Errors']))
+        return deleted, result.get('Number Not Found', 0)
+
+    def delete_objects(self, container, names, max_workers=None):
+        """
+        Deletes the objects names from container, with the bulk-delete
+        middleware if the cluster has it, otherwise with one DELETE per
+        object on up to max_workers threads. Objects that do not exist
+        are skipped.
+
+        :returns: the numbers of objects deleted and not found.
+        """
+        if not names:
+            return 0, 0
+        if self.bulk_delete is not False:
+            counts = self._bulk_delete(container, names)
+            self.bulk_delete = counts is not None
+            if counts is not None:
+                return counts
+            LOG.debug("Bulk delete is not available, deleting objects one "
+                      "by one")
+        deleted = not_found = 0
+        for result in self.batch(
+                lambda name: self.delete_object(container, utf8(name)), names,
+                max_workers):
+            if isinstance(result.error, exceptions.NotFound):
+                not_found += 1
+            else:
+                result.get()
+                deleted += 1
+        return deleted, not_found
+
+    def delete_container_objects(self, container, progress=None,
+                                 max_workers=None):
+        """
+        Deletes every object in container a listing page at a time, the
+        next page being listed while the current one is deleted. After
+        each page progress, if given, is called with the container and
+        the number of objects deleted so far.
+
+        :returns: the number of objects deleted.
+        """
+        total = 0
+        for page in self._object_pages(container, prefetch=True):
+            deleted, not_found = self.delete_objects(
+                container, [obj['name'] for obj in page], max_workers)
+            total += deleted
+            LOG.debug("Deleted %d objects from %s", total, container)
+            if progress is not None:
+                progress(container, total)
+        return total
+
     def create_object_segments(self, container, object_name, segment, data):
         """Creates object segments."""
         url = "{0}/{1}/{2}".format(container, object_name, segment)
         resp, body = self.put(url, data, self.headers)
         return resp, body
 
+    def _put_segment(self, container, object_name, index, data, retries):
+        segment = '%08d' % index
+        etag = hashlib.md5(data).hexdigest()
+
+        def put():
+            resp, body = self.create_object_segments(container, object_name,
+                                                     segment, data)
+            if resp.get('etag', etag).strip('"') != etag:
+                raise exceptions.ChecksumMismatch(
+                    name='%s/%s' % (object_name, segment),
+                    expected=etag, actual=resp['etag'])
+
+        _retry(put, retries,
+               'upload of segment %d of %s' % (index, object_name))
+        return {'path': '/%s/%s/%s' % (container, object_name, segment),
+                'etag': etag, 'size_bytes': len(data)}
+
+    def upload_large_object(self, container, object_name, data, segment_size,
+                            manifest='dlo', segment_container=None,
+                            max_workers=None, retries=2):
+        """
+        Uploads data, a string or file-like object, as a large object.
+
+        data is split into segments of segment_size bytes, named
+        <object_name>/<index> in segment_container, which are uploaded
+        on up to max_workers threads. Each thread reads its next segment
+        when it is done with one, so at most max_workers segments are in
+        memory. A segment whose upload fails or whose ETag does not match
+        is sent again up to retries times. Finally the object is written
+        as a 'dlo' (X-Object-Manifest) or 'slo' (static manifest).
+
+        :returns: the response of the manifest upload and the manifest
+            entries (path, etag and size_bytes) of the segments.
+        """
+        if manifest not in ('dlo', 'slo'):
+            raise ValueError("%s is not a valid manifest type" % manifest)
+        segment_container = segment_container or container
+        if isinstance(data, basestring):
+            data = StringIO.StringIO(data)
+        read_lock = threading.Lock()
+        indexes = itertools.count()
+        failed = []
+
+        def upload_segments(worker):
+            uploaded = []
+            while not failed:
+                with read_lock:
+                    chunk = data.read(segment_size)
+                    index = next(indexes)
+                if not chunk:
+                    break
+                try:
+                    uploaded.append((index, self._put_segment(
+                        segment_container, object_name, index, chunk,
+                        retries)))
+                except Exception:
+                    failed.append(index)
+                    raise
+            return uploaded
+
+        max_workers = max_workers or self.config.http.batch_workers
+        results = self.batch(upload_segments, range(max_workers),
+                             max_workers)
+        segments = [entry for index, entry in
+                    sorted(itertools.chain(*[r.get() for r in results]))]
+
+        url = "%s/%s" % (container, object_name)
+        headers = dict(self.headers)
+        if manifest == 'dlo':
+            headers['X-Object-Manifest'] = '%s/%s/' % (segment_container,
+                                                       object_name)
+            resp, body = self.put(url, '', headers)
+        else:
+            resp, body = self.put(url + '?multipart-manifest=put',
+                                  json.dumps(segments), headers)
+        return resp, segments
+
+    def _object_ranges(self, container, object_name, resp, range_size):
+        """
+        Returns (first byte, last byte, segment) for the ranges of at most
+        range_size bytes to download an object in. segment is the
+        (index, ETag) of the segment of a large object the range belongs
+        to, each segment starting a new range, or None for a plain
+        object.
+        """
+        size = int(resp['content-length'])
+        if resp.get('x-static-large-object', '').lower() == 'true':
+            resp, body = self.get("%s/%s?multipart-manifest=get" %
+                                  (container, object_name))
+            segments = [(s['bytes'], s['hash']) for s in json.loads(body)]
+        elif 'x-object-manifest' in resp:
+            segment_container, prefix = resp['x-object-manifest'].split('/',
+                                                                        1)
+            segments = [(s['bytes'], s['hash']) for page in
+                        self._object_pages(segment_container,
+                                           {'prefix': prefix})
+                        for s in page]
+        else:
+            segments = [(size, None)]
+        ranges = []
+        first = 0
+        for index, (length, etag) in enumerate(segments):
+            segment = None if etag is None else (index, etag)
+            end = first + length
+            for range_first in xrange(first, end, range_size):
+                ranges.append((range_first,
+                               min(range_first + range_size, end) - 1,
+                               segment))
+            first = end
+        return ranges
+
+    def download_large_object(self, container, object_name, dest=None,
+                              range_size=RANGE_SIZE, max_workers=None,
+                              retries=2):
+        """
+        Downloads an object with ranged GETs of at most range_size bytes
+        on up to max_workers threads and writes it in order to dest, a
+        file-like object, or discards it if dest is None. Ranges are
+        read from the connection in chunks, so at most max_workers
+        ranges are in memory whatever the size of the segments. Ranges
+        that fail are retried up to retries times. Every segment of a
+        large object, or else the object as a whole, is checked against
+        its ETag.
+
+        :returns: the response of the HEAD request on the object and the
+            number of bytes downloaded.
+        """
+        url = "{0}/{1}".format(container, object_name)
+        resp, body = self.head(url)
+        ranges = self._object_ranges(container, object_name, resp,
+                                     range_size)
+        max_workers = max_workers or self.config.http.batch_workers
+        md5 = hashlib.md5()
+        segment_md5 = None
+        size = 0
+
+        def fetch(byte_range):
+            first, last = byte_range[:2]
+
+            def get():
+                r, body = self.get_object(container, object_name,
+                                          stream=True,
+                                          byte_range=(first, last))
+                chunks = list(body)
+                length = sum(len(chunk) for chunk in chunks)
+                if length != last - first + 1:
+                    raise exceptions.RestClientException(
+                        "Got %d bytes for range %d-%d of %s" %
+                        (length, first, last, url))
+                return chunks
+
+            return _retry(get, retries, 'download of bytes %d-%d of %s' %
+                          (first, last, url))
+
+        # Fetch a window of ranges at a time so at most max_workers of
+        # them are held in memory before being written in order.
+        for start in xrange(0, len(ranges), max_workers):
+            results = self.batch(fetch, ranges[start:start + max_workers],
+                                 max_workers)
+            for position, result in enumerate(results, start + 1):
+                first, last, segment = result.item
+                if segment is not None and segment_md5 is None:
+                    segment_md5 = hashlib.md5()
+                for chunk in result.get():
+                    md5.update(chunk)
+                    if segment_md5 is not None:
+                        segment_md5.update(chunk)
+                    size += len(chunk)
+                    if dest is not None:
+                        dest.write(chunk)
+                if segment is None:
+                    continue
+                if position < len(ranges) and \
+                        ranges[position][2] == segment:
+                    continue
+                # The last range of the segment.
+                actual = segment_md5.hexdigest()
+                segment_md5 = None
+                if actual != segment[1]:
+                    raise exceptions.ChecksumMismatch(
+                        name='%s segment %d' % (url, segment[0]),
+                        expected=segment[1], actual=actual)
+
+        etag = resp.get('etag', '')
+        if not etag.startswith('"') and etag != md5.hexdigest():
+            # Large objects have a quoted ETag computed from the ETags of
+            # their segments, which were checked above.
+            raise exceptions.ChecksumMismatch(name=url, expected=etag,
+                                              actual=md5.hexdigest())
+        return resp, size
+
 
 class ObjectClientCustomizedHeader(RestClient):
 
@@ -161,8 +476,6 @@ class ObjectClientCustomizedHeader(RestClient):
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
         if headers is None:
             headers = {}
         if self.base_url is None:
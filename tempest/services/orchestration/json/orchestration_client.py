@@ -17,10 +17,10 @@
 
 import json
 import re
-import time
 import urllib
 
 from tempest.common import rest_client
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -123,56 +123,55 @@ class OrchestrationClient(rest_client.RestClient):
     def wait_for_resource_status(self, stack_identifier, resource_name,
                                  status, failure_pattern='^.*_FAILED$'):
         """Waits for a Resource to reach a given status."""
-        start = int(time.time())
         fail_regexp = re.compile(failure_pattern)
+        names = [resource_name]
 
-        while True:
+        def get_status():
             try:
                 resp, body = self.get_resource(
                     stack_identifier, resource_name)
             except exceptions.NotFound:
                 # ignore this, as the resource may not have
                 # been created yet
-                pass
-            else:
-                resource_name = body['logical_resource_id']
-                resource_status = body['resource_status']
-                if resource_status == status:
-                    return
-                if fail_regexp.search(resource_status):
-                    raise exceptions.StackBuildErrorException(
-                        stack_identifier=stack_identifier,
-                        resource_status=resource_status,
-                        resource_status_reason=body['resource_status_reason'])
-
-            if int(time.time()) - start >= self.build_timeout:
-                message = ('Resource %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (resource_name, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
-            time.sleep(self.build_interval)
+                return None
+            names.append(body['logical_resource_id'])
+            resource_status = body['resource_status']
+            if resource_status != status and \
+                    fail_regexp.search(resource_status):
+                raise exceptions.StackBuildErrorException(
+                    stack_identifier=stack_identifier,
+                    resource_status=resource_status,
+                    resource_status_reason=body['resource_status_reason'])
+            return resource_status
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'stack resource ' + status)
+        if not waiter.wait(get_status, lambda s: s == status):
+            message = ('Resource %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (names[-1], status, self.build_timeout))
+            raise exceptions.TimeoutException(message)
 
     def wait_for_stack_status(self, stack_identifier, status,
                               failure_pattern='^.*_FAILED$'):
         """Waits for a Stack to reach a given status."""
-        start = int(time.time())
         fail_regexp = re.compile(failure_pattern)
 
-        while True:
+        def get_stack():
             resp, body = self.get_stack(stack_identifier)
-            stack_name = body['stack_name']
             stack_status = body['stack_status']
-            if stack_status == status:
-                return
-            if fail_regexp.search(stack_status):
+            if stack_status != status and fail_regexp.search(stack_status):
                 raise exceptions.StackBuildErrorException(
                     stack_identifier=stack_identifier,
                     stack_status=stack_status,
                     stack_status_reason=body['stack_status_reason'])
-
-            if int(time.time()) - start >= self.build_timeout:
-                message = ('Stack %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (stack_name, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
-            time.sleep(self.build_interval)
+            return body
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'stack ' + status)
+        if not waiter.wait(get_stack, lambda s: s['stack_status'] == status):
+            message = ('Stack %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (waiter.value['stack_name'], status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
@@ -16,10 +16,10 @@
 #    under the License.
 
 import json
-import time
 import urllib
 
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -117,23 +117,52 @@ class VolumesClientJSON(RestClient):
 
     def wait_for_volume_status(self, volume_id, status):
         """Waits for a Volume to reach a given status."""
-        resp, body = self.get_volume(volume_id)
-        volume_name = body['display_name']
-        volume_status = body['status']
-        start = int(time.time())
-
-        while volume_status != status:
-            time.sleep(self.build_interval)
+        def get_volume():
             resp, body = self.get_volume(volume_id)
-            volume_status = body['status']
-            if volume_status == 'error':
-                raise exceptions.VolumeBuildErrorException(volume_id=volume_id)
-
-            if int(time.time()) - start >= self.build_timeout:
-                message = ('Volume %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (volume_name, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
+            if body['status'] == 'error' and status != 'error':
+                raise exceptions.VolumeBuildErrorException(
+                    volume_id=volume_id)
+            return body
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'volume ' + status)
+        if not waiter.wait(get_volume, lambda v: v['status'] == status):
+            message = ('Volume %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (waiter.value['display_name'], status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
+
+    def _list_volume_statuses(self, params):
+        resp, volumes = self.list_volumes_with_detail(params)
+        return dict((v['id'], v['status']) for v in volumes)
+
+    def _get_volume_status(self, volume_id):
+        try:
+            resp, volume = self.get_volume(volume_id)
+        except exceptions.NotFound:
+            return waiters.DELETED
+        return volume['status']
+
+    def wait_for_volumes_status(self, volume_ids, status, params=None):
+        """
+        Waits for several Volumes to reach a given status, polling the
+        volume list once per interval. Pass waiters.DELETED as status to
+        wait for the volumes to be deleted.
+        """
+        def error(volume_id):
+            return exceptions.VolumeBuildErrorException(volume_id=volume_id)
+
+        waiter = waiters.BatchWaiter(
+            lambda: self._list_volume_statuses(params),
+            self.build_timeout, self.build_interval, 'volume ' + status,
+            error_statuses=('error',), get_status=self._get_volume_status)
+        if not waiter.wait(volume_ids, status, error):
+            message = ('Volumes %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (', '.join(sorted(waiter.pending)), status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
 
     def is_resource_deleted(self, id):
         try:
@@ -18,6 +18,7 @@ import urllib
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.openstack.common import log as logging
 from tempest.services.compute.xml.common import Document
@@ -106,26 +107,59 @@ class SnapshotsClientXML(RestClientXML):
     def wait_for_snapshot_status(self, snapshot_id, status):
         """Waits for a Snapshot to reach a given status."""
         start_time = time.time()
-        old_value = value = self._get_snapshot_status(snapshot_id)
-        while True:
-            dtime = time.time() - start_time
-            time.sleep(self.build_interval)
-            if value != old_value:
-                LOG.info('Value transition from "%s" to "%s"'
-                         'in %d second(s).', old_value,
-                         value, dtime)
-            if (value == status):
-                return value
-
-            if dtime > self.build_timeout:
-                message = ('Time Limit Exceeded! (%ds)'
-                           'while waiting for %s, '
-                           'but we got %s.' %
-                           (self.build_timeout, status, value))
-                raise exceptions.TimeoutException(message)
-            time.sleep(self.build_interval)
-            old_value = value
+        values = []
+
+        def get_status():
             value = self._get_snapshot_status(snapshot_id)
+            if values and value != values[-1]:
+                LOG.info('Value transition from "%s" to "%s"'
+                         'in %d second(s).', values[-1],
+                         value, time.time() - start_time)
+            values.append(value)
+            return value
+
+        waiter = waiters.Waiter(self.build_timeout, self.build_interval,
+                                'snapshot ' + status)
+        if not waiter.wait(get_status, lambda v: v == status):
+            message = ('Time Limit Exceeded! (%ds)'
+                       'while waiting for %s, '
+                       'but we got %s.' %
+                       (self.build_timeout, status, waiter.value))
+            raise exceptions.TimeoutException(message)
+        return waiter.value
+
+    def _list_snapshot_statuses(self, params):
+        resp, snapshots = self.list_snapshots_with_detail(params)
+        return dict((s['id'], s['status']) for s in snapshots)
+
+    def _lookup_snapshot_status(self, snapshot_id):
+        try:
+            resp, snapshot = self.get_snapshot(snapshot_id)
+        except exceptions.NotFound:
+            return waiters.DELETED
+        return snapshot['status']
+
+    def wait_for_snapshots_status(self, snapshot_ids, status, params=None):
+        """
+        Waits for several Snapshots to reach a given status, polling the
+        snapshot list once per interval. Pass waiters.DELETED as status to
+        wait for the snapshots to be deleted.
+        """
+        def error(snapshot_id):
+            return exceptions.SnapshotBuildErrorException(
+                snapshot_id=snapshot_id)
+
+        waiter = waiters.BatchWaiter(
+            lambda: self._list_snapshot_statuses(params),
+            self.build_timeout, self.build_interval, 'snapshot ' + status,
+            error_statuses=('error',),
+            get_status=self._lookup_snapshot_status)
+        if not waiter.wait(snapshot_ids, status, error):
+            message = ('Snapshots %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (', '.join(sorted(waiter.pending)), status,
+                        self.build_timeout))
+            raise exceptions.TimeoutException(message)
 
     def delete_snapshot(self, snapshot_id):
         """Delete Snapshot."""
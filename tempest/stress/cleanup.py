@@ -17,85 +17,170 @@
 #    limitations under the License.
 
 from tempest import clients
+from tempest.common import pagination
+from tempest.common import teardown
+from tempest.common import waiters
+from tempest import exceptions
+
+# Servers are listed in pages of this size, which is the default
+# osapi_max_limit of Nova.
+PAGE_SIZE = 1000
+
+
+def _tagged(resources, run_id, key='name'):
+    if run_id is None:
+        return resources
+    return [r for r in resources if run_id in (r.get(key) or '')]
+
+
+def _wait(logger, kind, wait, ids):
+    """Calls wait(ids), logging the ids still pending when it fails."""
+    if not ids:
+        return
+    try:
+        wait(ids)
+    except exceptions.TimeoutException as e:
+        logger.warning("Cleanup::%s left behind: %s" % (kind, e))
+    except Exception:
+        logger.exception("Cleanup::waiting for %s failed" % kind)
+
+
+def _cleanup_servers(admin_manager, logger, run_id):
+    client = admin_manager.servers_client
+    params = {"all_tenants": True}
+    if run_id is not None:
+        # Nova matches the name filter as a regular expression.
+        params['name'] = run_id
+
+    def list_page(marker):
+        page_params = dict(params, limit=PAGE_SIZE)
+        if marker is not None:
+            page_params['marker'] = marker
+        _, body = client.list_servers(page_params)
+        return body['servers']
+
+    # List everything before deleting anything, a marker deleted while
+    # paging could not be found any more.
+    server_ids = []
+    for page in pagination.iter_pages(list_page, lambda page: page[-1]['id'],
+                                      limit=PAGE_SIZE, prefetch=True):
+        server_ids.extend(s['id'] for s in page)
+    logger.debug("Cleanup::remove %s servers" % len(server_ids))
+    client.batch(client.delete_server, server_ids)
+    _wait(logger, 'servers', lambda ids: client.wait_for_servers_termination(
+        ids, ignore_error=True, params=params), server_ids)
+
+
+def _cleanup_keypairs(admin_manager, logger, run_id):
+    client = admin_manager.keypairs_client
+    _, keypairs = client.list_keypairs()
+    # Each keypair of the listing is wrapped in a 'keypair' element.
+    names = [k['name'] for k in _tagged([k['keypair'] for k in keypairs],
+                                        run_id)]
+    logger.debug("Cleanup::remove %s keypairs" % len(names))
+    client.batch(client.delete_keypair, names)
+
+
+def _cleanup_floating_ips(admin_manager, logger, run_id):
+    client = admin_manager.floating_ips_client
+    _, floating_ips = client.list_floating_ips()
+    logger.debug("Cleanup::remove %s floating ips" % len(floating_ips))
+    client.batch(client.delete_floating_ip, [f['id'] for f in floating_ips])
 
 
-def cleanup(logger):
-    admin_manager = clients.AdminManager()
-
-    _, body = admin_manager.servers_client.list_servers({"all_tenants": True})
-    logger.debug("Cleanup::remove %s servers" % len(body['servers']))
-    for s in body['servers']:
-        try:
-            admin_manager.servers_client.delete_server(s['id'])
-        except Exception:
-            pass
-
-    for s in body['servers']:
-        try:
-            admin_manager.servers_client.wait_for_server_termination(s['id'])
-        except Exception:
-            pass
-
-    _, keypairs = admin_manager.keypairs_client.list_keypairs()
-    logger.debug("Cleanup::remove %s keypairs" % len(keypairs))
-    for k in keypairs:
-        try:
-            admin_manager.keypairs_client.delete_keypair(k['name'])
-        except Exception:
-            pass
-
-    _, floating_ips = admin_manager.floating_ips_client.list_floating_ips()
-    logger.debug("Cleanup::remove %s floating ips" % len(floating_ips))
-    for f in floating_ips:
-        try:
-            admin_manager.floating_ips_client.delete_floating_ip(f['id'])
-        except Exception:
-            pass
-
-    _, users = admin_manager.identity_client.get_users()
-    logger.debug("Cleanup::remove %s users" % len(users))
-    for user in users:
-        if user['name'].startswith("stress_user"):
-            admin_manager.identity_client.delete_user(user['id'])
-
-    _, tenants = admin_manager.identity_client.list_tenants()
-    logger.debug("Cleanup::remove %s tenants" % len(tenants))
-    for tenant in tenants:
-        if tenant['name'].startswith("stress_tenant"):
-            admin_manager.identity_client.delete_tenant(tenant['id'])
-
-    # We have to delete snapshots first or
-    # volume deletion may block
-
-    _, snaps = admin_manager.snapshots_client.\
-        list_snapshots({"all_tenants": True})
+def _cleanup_snapshots(admin_manager, logger, run_id):
+    client = admin_manager.snapshots_client
+    params = {"all_tenants": True}
+    _, snaps = client.list_snapshots(params)
+    snaps = _tagged(snaps, run_id, 'display_name')
     logger.debug("Cleanup::remove %s snapshots" % len(snaps))
-    for v in snaps:
-        try:
-            admin_manager.snapshots_client.\
-                wait_for_snapshot_status(v['id'], 'available')
-            admin_manager.snapshots_client.delete_snapshot(v['id'])
-        except Exception:
-            pass
-
-    for v in snaps:
-        try:
-            admin_manager.snapshots_client.wait_for_resource_deletion(v['id'])
-        except Exception:
-            pass
-
-    _, vols = admin_manager.volumes_client.list_volumes({"all_tenants": True})
+    # Snapshots already in error can be deleted right away; wait for the
+    # others to settle with one listing per poll.
+    _wait(logger, 'snapshots', lambda ids: client.wait_for_snapshots_status(
+        ids, 'available', params=params),
+        [v['id'] for v in snaps if v.get('status') != 'error'])
+    client.batch(client.delete_snapshot, [v['id'] for v in snaps])
+    _wait(logger, 'snapshots', lambda ids: client.wait_for_snapshots_status(
+        ids, waiters.DELETED, params=params), [v['id'] for v in snaps])
+
+
+def _cleanup_volumes(admin_manager, logger, run_id):
+    client = admin_manager.volumes_client
+    params = {"all_tenants": True}
+    _, vols = client.list_volumes(params)
+    vols = _tagged(vols, run_id, 'display_name')
     logger.debug("Cleanup::remove %s volumes" % len(vols))
-    for v in vols:
-        try:
-            admin_manager.volumes_client.\
-                wait_for_volume_status(v['id'], 'available')
-            admin_manager.volumes_client.delete_volume(v['id'])
-        except Exception:
-            pass
-
-    for v in vols:
-        try:
-            admin_manager.volumes_client.wait_for_resource_deletion(v['id'])
-        except Exception:
-            pass
+    _wait(logger, 'volumes', lambda ids: client.wait_for_volumes_status(
+        ids, 'available', params=params),
+        [v['id'] for v in vols if v.get('status') != 'error'])
+    client.batch(client.delete_volume, [v['id'] for v in vols])
+    _wait(logger, 'volumes', lambda ids: client.wait_for_volumes_status(
+        ids, waiters.DELETED, params=params), [v['id'] for v in vols])
+
+
+def _cleanup_users(admin_manager, logger, user_ids):
+    client = admin_manager.identity_client
+    if user_ids is None:
+        _, users = client.get_users()
+        user_ids = [u['id'] for u in users
+                    if u['name'].startswith("stress_user")]
+    logger.debug("Cleanup::remove %s users" % len(user_ids))
+    for result in client.batch(client.delete_user, user_ids):
+        result.get()
+
+
+def _cleanup_tenants(admin_manager, logger, tenant_ids):
+    client = admin_manager.identity_client
+    if tenant_ids is None:
+        _, tenants = client.list_tenants()
+        tenant_ids = [t['id'] for t in tenants
+                      if t['name'].startswith("stress_tenant")]
+    logger.debug("Cleanup::remove %s tenants" % len(tenant_ids))
+    for result in client.batch(client.delete_tenant, tenant_ids):
+        result.get()
+
+
+def cleanup(logger, run_id=None, credentials=None):
+    """
+    Deletes what stress tests left behind. Independent resource types
+    are cleaned up concurrently, volumes after the servers they may be
+    attached to and the snapshots of them, users and tenants last.
+
+    :param run_id: only delete the servers, keypairs, volumes and
+        snapshots whose name contains it, as the names of everything a
+        stress run creates do. Floating IPs are then left alone, they
+        have no name. Without run_id everything is deleted.
+    :param credentials: the (tenant id, user id) pairs created by the
+        run, deleted without listing the users and tenants. Without them
+        every user and tenant named like a stress one is deleted.
+    """
+    admin_manager = clients.AdminManager()
+    tenant_ids = user_ids = None
+    if credentials is not None:
+        tenant_ids = [tenant_id for tenant_id, _ in credentials]
+        user_ids = [user_id for _, user_id in credentials]
+
+    config = admin_manager.config
+    cleaner = teardown.Teardown(config.http.batch_workers,
+                                config.compute.build_timeout,
+                                config.compute.build_interval)
+    cleaner.add('servers', lambda: _cleanup_servers(admin_manager, logger,
+                                                    run_id), 'server')
+    cleaner.add('keypairs', lambda: _cleanup_keypairs(admin_manager, logger,
+                                                      run_id), 'keypair')
+    if run_id is None:
+        cleaner.add('floating ips', lambda: _cleanup_floating_ips(
+            admin_manager, logger, run_id), 'floating_ip')
+    # We have to delete snapshots first or volume deletion may block
+    cleaner.add('snapshots', lambda: _cleanup_snapshots(
+        admin_manager, logger, run_id), 'snapshot')
+    cleaner.add('volumes', lambda: _cleanup_volumes(admin_manager, logger,
+                                                    run_id), 'volume')
+    cleaner.add('users', lambda: _cleanup_users(admin_manager, logger,
+                                                user_ids), 'user')
+    cleaner.add('tenants', lambda: _cleanup_tenants(admin_manager, logger,
+                                                    tenant_ids), 'tenant')
+    cleaner.run()
+    if cleaner.errors:
+        exc_info = cleaner.errors[0]
+        raise exc_info[0], exc_info[1], exc_info[2]
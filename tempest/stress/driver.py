@@ -16,6 +16,7 @@ import logging
 import multiprocessing
 import signal
 import time
+import uuid
 
 from tempest import clients
 from tempest.common import ssh
@@ -23,6 +24,7 @@ from tempest.common.utils.data_utils import rand_name
 from tempest import exceptions
 from tempest.openstack.common import importutils
 from tempest.stress import cleanup
+from tempest.stress import stressaction
 
 admin_manager = clients.AdminManager()
 
@@ -126,6 +128,9 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
         computes = _get_compute_nodes(controller)
         for node in computes:
             do_ssh("rm -f %s" % logfiles, node)
+    run_id = uuid.uuid4().hex[:8]
+    logger.info("Stress run %s" % run_id)
+    credentials = []
     for test in tests:
         if test.get('use_admin', False):
             manager = admin_manager
@@ -133,21 +138,23 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
             manager = clients.Manager()
         for p_number in xrange(test.get('threads', 1)):
             if test.get('use_isolated_tenants', False):
-                username = rand_name("stress_user")
-                tenant_name = rand_name("stress_tenant")
+                username = rand_name("stress_user_%s_" % run_id)
+                tenant_name = rand_name("stress_tenant_%s_" % run_id)
                 password = "pass"
                 identity_client = admin_manager.identity_client
                 _, tenant = identity_client.create_tenant(name=tenant_name)
-                identity_client.create_user(username,
-                                            password,
-                                            tenant['id'],
-                                            "email")
+                _, user = identity_client.create_user(username,
+                                                      password,
+                                                      tenant['id'],
+                                                      "email")
+                credentials.append((tenant['id'], user['id']))
                 manager = clients.Manager(username=username,
                                           password="pass",
                                           tenant_name=tenant_name)
 
             test_obj = importutils.import_class(test['action'])
-            test_run = test_obj(manager, logger, max_runs, stop_on_error)
+            test_run = test_obj(manager, logger, max_runs, stop_on_error,
+                                run_id)
 
             kwargs = test.get('kwargs', {})
             test_run.setUp(**dict(kwargs.iteritems()))
@@ -155,10 +162,7 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
             logger.debug("calling Target Object %s" %
                          test_run.__class__.__name__)
 
-            mp_manager = multiprocessing.Manager()
-            shared_statistic = mp_manager.dict()
-            shared_statistic['runs'] = 0
-            shared_statistic['fails'] = 0
+            shared_statistic = stressaction.SharedStatistic()
 
             p = multiprocessing.Process(target=test_run.execute,
                                         args=(shared_statistic,))
@@ -193,7 +197,7 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
         time.sleep(min(remaining, log_check_interval))
         if stop_on_error:
             for process in processes:
-                if process['statistic']['fails'] > 0:
+                if process['statistic'].fails > 0:
                     break
 
         if not logfiles:
@@ -208,24 +212,41 @@ def stress_openstack(tests, duration, max_runs=None, stop_on_error=False):
     sum_fails = 0
     sum_runs = 0
 
+    durations = {}
+
     logger.info("Statistics (per process):")
     for process in processes:
-        if process['statistic']['fails'] > 0:
+        statistic = process['statistic']
+        if statistic.fails > 0:
             had_errors = True
-        sum_runs += process['statistic']['runs']
-        sum_fails += process['statistic']['fails']
+        sum_runs += statistic.runs
+        sum_fails += statistic.fails
         logger.info(" Process %d (%s): Run %d actions (%d failed)" %
                     (process['p_number'],
                      process['action'],
-                     process['statistic']['runs'],
-                     process['statistic']['fails']))
+                     statistic.runs,
+                     statistic.fails))
+        histogram = statistic.histogram()
+        if process['action'] in durations:
+            durations[process['action']].merge(histogram)
+        else:
+            durations[process['action']] = histogram
+    logger.info("Duration of actions (seconds):")
+    for action, histogram in sorted(durations.items()):
+        if not histogram.count:
+            continue
+        logger.info(" %s: mean %.2f, min %.2f, p50 %.2f, p95 %.2f, "
+                    "p99 %.2f, max %.2f" %
+                    (action, histogram.sum / histogram.count, histogram.min,
+                     histogram.quantile(0.5), histogram.quantile(0.95),
+                     histogram.quantile(0.99), histogram.max))
     logger.info("Summary:")
     logger.info("Run %d actions (%d failed)" %
                 (sum_runs, sum_fails))
 
     if not had_errors:
         logger.info("cleaning up")
-        cleanup.cleanup(logger)
+        cleanup.cleanup(logger, run_id, credentials)
     if had_errors:
         return 1
     else:
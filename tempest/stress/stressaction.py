@@ -14,17 +14,90 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+import multiprocessing
 import signal
 import sys
+import time
+
+from tempest.common import metrics
+from tempest.common.utils.data_utils import rand_name
+
+# Slots of SharedStatistic, the histogram bucket counts follow them.
+_RUNS, _FAILS, _SUM, _MIN, _MAX, _BUCKETS = range(6)
+
+# Upper bounds, in seconds, of the run duration histogram buckets. A run
+# may wait for several resources to build, each for up to build_timeout.
+RUN_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+               300.0, 600.0, 1200.0, 1800.0)
+
+
+class SharedStatistic(object):
+    """
+    Run and failure counts and run duration histogram of one worker.
+
+    The values are kept in a shared memory array the worker process
+    updates in place and the driver reads, so recording a run needs no
+    IPC. Only the worker writes to it, hence there is no lock; the run
+    count is updated last so a reader never sees more runs than
+    durations.
+    """
+
+    def __init__(self, buckets=RUN_BUCKETS):
+        self.buckets = buckets
+        self._values = multiprocessing.Array(
+            'd', _BUCKETS + len(buckets) + 1, lock=False)
+        self._values[_MIN] = float('inf')
+
+    @property
+    def runs(self):
+        return int(self._values[_RUNS])
+
+    @property
+    def fails(self):
+        return int(self._values[_FAILS])
+
+    def record(self, seconds, failed=False):
+        values = self._values
+        values[_BUCKETS + bisect.bisect_left(self.buckets, seconds)] += 1
+        values[_SUM] += seconds
+        values[_MIN] = min(values[_MIN], seconds)
+        values[_MAX] = max(values[_MAX], seconds)
+        if failed:
+            values[_FAILS] += 1
+        values[_RUNS] += 1
+
+    def histogram(self):
+        """Returns a snapshot of the durations as a metrics.Histogram."""
+        values = self._values[:]
+        histogram = metrics.Histogram(self.buckets)
+        histogram.counts = [int(count) for count in values[_BUCKETS:]]
+        histogram.count = sum(histogram.counts)
+        histogram.sum = values[_SUM]
+        if histogram.count:
+            histogram.min = values[_MIN]
+            histogram.max = values[_MAX]
+        return histogram
 
 
 class StressAction(object):
 
-    def __init__(self, manager, logger, max_runs=None, stop_on_error=False):
+    def __init__(self, manager, logger, max_runs=None, stop_on_error=False,
+                 run_id=None):
         self.manager = manager
         self.logger = logger
         self.max_runs = max_runs
         self.stop_on_error = stop_on_error
+        self.run_id = run_id
+
+    def rand_name(self, name):
+        """
+        Returns a random name for a resource, tagged with the id of the
+        stress run so the cleanup finds it without listing everything.
+        """
+        if self.run_id:
+            name = '%s-%s-' % (name, self.run_id)
+        return rand_name(name)
 
     def _shutdown_handler(self, signal, frame):
         self.tearDown()
@@ -50,21 +123,24 @@ class StressAction(object):
         """This is the main execution entry point called
         by the driver.   We register a signal handler to
         allow us to gracefull tearDown, and then exit.
-        We also keep track of how many runs we do.
+        We also keep track of how many runs we do, and how
+        long they take, in shared_statistic, a SharedStatistic.
         """
         signal.signal(signal.SIGHUP, self._shutdown_handler)
         signal.signal(signal.SIGTERM, self._shutdown_handler)
 
-        while self.max_runs is None or (shared_statistic['runs'] <
+        while self.max_runs is None or (shared_statistic.runs <
                                         self.max_runs):
+            start = time.time()
+            failed = False
             try:
                 self.run()
             except Exception:
-                shared_statistic['fails'] += 1
+                failed = True
                 self.logger.exception("Failure in run")
             finally:
-                shared_statistic['runs'] += 1
-                if self.stop_on_error and (shared_statistic['fails'] > 1):
+                shared_statistic.record(time.time() - start, failed)
+                if self.stop_on_error and (shared_statistic.fails > 1):
                     self.logger.warn("Stop process due to"
                                      "\"stop-on-error\" argument")
                     self.tearDown()
@@ -15,16 +15,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+import json
 import os
-import time
 
 import fixtures
 import nose.plugins.attrib
 import testresources
 import testtools
+from testtools import content
 
 from tempest import clients
-from tempest.common.utils.data_utils import rand_name
+from tempest.common import credential_pool
+from tempest.common import identity_setup
+from tempest.common import metrics
+from tempest.common import teardown
+from tempest.common import waiters
 from tempest import config
 from tempest import exceptions
 from tempest.openstack.common import log as logging
@@ -124,6 +130,13 @@ class BaseTestCase(testtools.TestCase,
             stderr = cls.useFixture(fixtures.StringStream('stderr')).stream
             cls.useFixture(fixtures.MonkeyPatch('sys.stderr', stderr))
 
+        request_metrics = metrics.get_metrics(cls.config)
+        if request_metrics.enabled:
+            counters = request_metrics.counters()
+            cls.addCleanup(lambda: cls.addDetail(
+                'request-metrics', content.text_content(json.dumps(
+                    request_metrics.since(counters), indent=2))))
+
     @classmethod
     def _get_identity_admin_client(cls):
         """
@@ -148,80 +161,175 @@ class BaseTestCase(testtools.TestCase,
         """
         Creates a new set of user/tenant/password credentials for a
         **regular** user of the Compute API so that a test case can
-        operate in an isolated tenant container.
+        operate in an isolated tenant container. With a credential pool
+        configured the credentials are leased from the pool instead.
         """
+        if admin:
+            kind = 'admin'
+        elif cls.isolated_creds:
+            # Main user already created. Create the alt one...
+            kind = 'alt'
+        else:
+            kind = 'primary'
         admin_client = cls._get_identity_admin_client()
-        password = "pass"
-
-        while True:
-            try:
-                rand_name_root = rand_name(cls.__name__)
-                if cls.isolated_creds:
-                # Main user already created. Create the alt or admin one...
-                    if admin:
-                        rand_name_root += '-admin'
-                    else:
-                        rand_name_root += '-alt'
-                tenant_name = rand_name_root + "-tenant"
-                tenant_desc = tenant_name + "-desc"
-
-                resp, tenant = admin_client.create_tenant(
-                    name=tenant_name, description=tenant_desc)
-                break
-            except exceptions.Duplicate:
-                if cls.config.compute.allow_tenant_reuse:
-                    tenant = admin_client.get_tenant_by_name(tenant_name)
-                    LOG.info('Re-using existing tenant %s', tenant)
-                    break
-
-        while True:
-            try:
-                rand_name_root = rand_name(cls.__name__)
-                if cls.isolated_creds:
-                # Main user already created. Create the alt one...
-                    rand_name_root += '-alt'
-                username = rand_name_root + "-user"
-                email = rand_name_root + "@example.com"
-                resp, user = admin_client.create_user(username,
-                                                      password,
-                                                      tenant['id'],
-                                                      email)
-                break
-            except exceptions.Duplicate:
-                if cls.config.compute.allow_tenant_reuse:
-                    user = admin_client.get_user_by_username(tenant['id'],
-                                                             username)
-                    LOG.info('Re-using existing user %s', user)
-                    break
+        pool = credential_pool.get_credential_pool(cls.config)
+        if pool is not None:
+            user, tenant, password = pool.lease(
+                kind, lambda: cls._create_creds(admin_client, 'tempest-pool',
+                                                kind))
+        else:
+            user, tenant, password = cls._create_creds(admin_client,
+                                                       cls.__name__, kind)
         # Store the complete creds (including UUID ids...) for later
         # but return just the username, tenant_name, password tuple
         # that the various clients will use.
-        cls.isolated_creds.append((user, tenant))
+        cls.isolated_creds.append((user, tenant, password))
+        return user['name'], tenant['name'], password
 
-        # Assign admin role if this is for admin creds
-        if admin:
-            _, roles = admin_client.list_roles()
-            role = None
-            try:
-                _, roles = admin_client.list_roles()
-                role = next(r for r in roles if r['name'] == 'admin')
-            except StopIteration:
-                msg = "No admin role found"
-                raise exceptions.NotFound(msg)
-            admin_client.assign_user_role(tenant['id'], user['id'], role['id'])
-
-        return username, tenant_name, password
+    @classmethod
+    def _create_creds(cls, admin_client, name, kind):
+        """
+        Creates a tenant and a user in it, with the admin role if kind
+        is 'admin', and returns them with the password.
+        """
+        return identity_setup.create_creds(
+            admin_client, name, kind, cls.config.compute.allow_tenant_reuse)
 
     @classmethod
     def _clear_isolated_creds(cls):
         if not cls.isolated_creds:
             return
+        pool = credential_pool.get_credential_pool(cls.config)
+        if pool is not None:
+            # Whatever the class failed to delete would be inherited by
+            # the next lease, credentials with leftovers are quarantined.
+            for user, tenant, password in cls.isolated_creds:
+                pool.release(user, clean=cls._scrub_tenant(user, tenant,
+                                                           password))
+            return
         admin_client = cls._get_identity_admin_client()
 
-        for user, tenant in cls.isolated_creds:
+        for user, tenant, password in cls.isolated_creds:
             admin_client.delete_user(user['id'])
             admin_client.delete_tenant(tenant['id'])
 
+    @classmethod
+    def _scrub_tenant(cls, user, tenant, password):
+        """
+        Deletes the servers, volumes, snapshots, keypairs, security
+        groups, floating IPs and private images left in the tenant of
+        pooled credentials. Neutron resources are not deleted, a tenant
+        owning any is not considered clean.
+
+        :returns: True if the tenant was left empty.
+        """
+        conf = cls.config
+        cleaner = teardown.Teardown(conf.http.batch_workers,
+                                    conf.compute.build_timeout,
+                                    conf.compute.build_interval)
+        kept = []
+        try:
+            manager = clients.Manager(user['name'], password,
+                                      tenant['name'])
+            if conf.service_available.nova:
+                _add_compute_leftovers(cleaner, manager)
+            if conf.service_available.cinder:
+                _add_volume_leftovers(cleaner, manager)
+            if conf.service_available.glance:
+                _add_image_leftovers(cleaner, manager, tenant['id'])
+            if conf.service_available.neutron:
+                kept = _network_leftovers(manager, tenant['id'])
+        except Exception:
+            LOG.exception("Listing the resources left in tenant %s failed",
+                          tenant['name'])
+            return False
+        if kept:
+            LOG.warning("Tenant %s keeps %s", tenant['name'],
+                        ', '.join(kept))
+        return not cleaner.run() and not kept
+
+
+def _is_gone(get, resource_id):
+    try:
+        get(resource_id)
+    except exceptions.NotFound:
+        return True
+    return False
+
+
+def _add_compute_leftovers(cleaner, manager):
+    servers = manager.servers_client
+    for server in servers.list_servers()[1]['servers']:
+        cleaner.add('server %s' % server['id'],
+                    functools.partial(servers.delete_server, server['id']),
+                    'server',
+                    functools.partial(_is_gone, servers.get_server,
+                                      server['id']))
+    floating_ips = manager.floating_ips_client
+    for floating_ip in floating_ips.list_floating_ips()[1]:
+        cleaner.add('floating IP %s' % floating_ip['ip'],
+                    functools.partial(floating_ips.delete_floating_ip,
+                                      floating_ip['id']),
+                    'floating_ip')
+    keypairs = manager.keypairs_client
+    for keypair in keypairs.list_keypairs()[1]:
+        name = keypair['keypair']['name']
+        cleaner.add('keypair %s' % name,
+                    functools.partial(keypairs.delete_keypair, name),
+                    'keypair')
+    security_groups = manager.security_groups_client
+    for group in security_groups.list_security_groups()[1]:
+        if group['name'] == 'default':
+            continue
+        cleaner.add('security group %s' % group['name'],
+                    functools.partial(security_groups.delete_security_group,
+                                      group['id']),
+                    'security_group')
+
+
+def _add_volume_leftovers(cleaner, manager):
+    snapshots = manager.snapshots_client
+    for snapshot in snapshots.list_snapshots()[1]:
+        cleaner.add('snapshot %s' % snapshot['id'],
+                    functools.partial(snapshots.delete_snapshot,
+                                      snapshot['id']),
+                    'snapshot',
+                    functools.partial(snapshots.is_resource_deleted,
+                                      snapshot['id']))
+    volumes = manager.volumes_client
+    for volume in volumes.list_volumes()[1]:
+        cleaner.add('volume %s' % volume['id'],
+                    functools.partial(volumes.delete_volume, volume['id']),
+                    'volume',
+                    functools.partial(volumes.is_resource_deleted,
+                                      volume['id']))
+
+
+def _add_image_leftovers(cleaner, manager, tenant_id):
+    images = manager.image_client
+    for image in images.image_list_detail(is_public=False)[1]:
+        if image.get('owner') != tenant_id:
+            continue
+        cleaner.add('image %s' % image['id'],
+                    functools.partial(images.delete_image, image['id']),
+                    'image',
+                    functools.partial(_is_gone, images.get_image_meta,
+                                      image['id']))
+
+
+def _network_leftovers(manager, tenant_id):
+    """Returns the names of the Neutron resources owned by tenant_id."""
+    network = manager.network_client
+    kept = []
+    for kind, list_resources in (('network', network.list_networks),
+                                 ('subnet', network.list_subnets),
+                                 ('port', network.list_ports),
+                                 ('router', network.list_routers)):
+        for resource in list_resources()[1][kind + 's']:
+            if resource.get('tenant_id') == tenant_id:
+                kept.append('%s %s' % (kind, resource['id']))
+    return kept
+
 
 def call_until_true(func, duration, sleep_for):
     """
@@ -232,18 +340,11 @@ def call_until_true(func, duration, sleep_for):
     :param func: A zero argument callable that returns True on success.
     :param duration: The number of seconds for which to attempt a
         successful call of the function.
-    :param sleep_for: The number of seconds to sleep after an unsuccessful
-                      invocation of the function.
+    :param sleep_for: The longest number of seconds to sleep after an
+                      unsuccessful invocation of the function; the
+                      [waiter] strategy may poll sooner.
     """
-    now = time.time()
-    timeout = now + duration
-    while now < timeout:
-        if func():
-            return True
-        LOG.debug("Sleeping for %d seconds", sleep_for)
-        time.sleep(sleep_for)
-        now = time.time()
-    return False
+    return waiters.Waiter(duration, sleep_for).wait(func)
 
 
 class TestCase(BaseTestCase):
@@ -311,3 +412,26 @@ class TestCase(BaseTestCase):
                                conf.compute.build_interval):
             self.fail("Timed out waiting for thing %s to become %s"
                       % (thing_id, expected_status))
+
+    def batch_status_timeout(self, things, thing_ids, expected_status):
+        """
+        Like status_timeout, but waits for several things of the same
+        kind with a single list() call per poll instead of one get()
+        per thing.
+        """
+        def list_statuses():
+            return dict((thing.id, thing.status) for thing in things.list())
+
+        def error(thing_id):
+            return self.failureException("%s failed to get to expected "
+                                         "status. In ERROR state."
+                                         % thing_id)
+
+        conf = config.TempestConfig()
+        waiter = waiters.BatchWaiter(list_statuses,
+                                     conf.compute.build_timeout,
+                                     conf.compute.build_interval)
+        if not waiter.wait(thing_ids, expected_status, error):
+            self.fail("Timed out waiting for things %s to become %s"
+                      % (', '.join(sorted(waiter.pending)),
+                         expected_status))
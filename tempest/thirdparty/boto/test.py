@@ -16,6 +16,7 @@
 #    under the License.
 
 import contextlib
+import functools
 import logging as orig_logging
 import os
 import re
@@ -28,6 +29,7 @@ from boto import s3
 import keystoneclient.exceptions
 
 import tempest.clients
+from tempest.common import teardown
 from tempest.common.utils.file_utils import have_effective_read_access
 import tempest.config
 from tempest import exceptions
@@ -190,6 +192,22 @@ def friendly_function_call_str(call_able, *args, **kwargs):
     return string + ")"
 
 
+# Kinds of the resources removed by the cleanup functions, by name. The
+# destroy_* functions wait for the resource to be gone themselves.
+CLEANUP_KINDS = {
+    'destroy_reservation': 'server',
+    'destroy_volume_wait': 'volume',
+    'delete_volume': 'volume',
+    'destroy_snapshot_wait': 'snapshot',
+    'destroy_security_group_wait': 'security_group',
+    'delete_security_group': 'security_group',
+    'delete_key_pair': 'keypair',
+    'deregister_image': 'image',
+    'destroy_bucket': 'bucket',
+    'release_address': 'floating_ip',
+}
+
+
 class BotoTestCase(tempest.test.BaseTestCase):
     """Recommended to use as base class for boto related test."""
 
@@ -246,23 +264,23 @@ class BotoTestCase(tempest.test.BaseTestCase):
     def tearDownClass(cls):
         """Calls the callables added by addResourceCleanUp,
         when you overwire this function dont't forget to call this too.
+        Cleanups of known kinds run concurrently where their dependencies
+        allow, the others in the reverse order they were added in.
         """
-        fail_count = 0
-        trash_keys = sorted(cls._resource_trash_bin, reverse=True)
-        for key in trash_keys:
+        cleanup = teardown.Teardown(cls.config.http.batch_workers,
+                                    cls.config.compute.build_timeout,
+                                    cls.config.compute.build_interval)
+        for key in sorted(cls._resource_trash_bin):
             (function, pos_args, kw_args) = cls._resource_trash_bin[key]
-            try:
-                LOG.debug("Cleaning up: %s" %
-                          friendly_function_call_str(function, *pos_args,
-                                                     **kw_args))
-                function(*pos_args, **kw_args)
-            except BaseException as exc:
-                fail_count += 1
-                LOG.exception(exc)
-            finally:
-                del cls._resource_trash_bin[key]
-        if fail_count:
-            raise exceptions.TearDownException(num=fail_count)
+            cleanup.add(friendly_function_call_str(function, *pos_args,
+                                                   **kw_args),
+                        functools.partial(function, *pos_args, **kw_args),
+                        CLEANUP_KINDS.get(getattr(function, '__name__',
+                                                  None)))
+        cls._resource_trash_bin.clear()
+        cleanup.run()
+        if cleanup.errors:
+            raise exceptions.TearDownException(num=len(cleanup.errors))
 
     ec2_error_code = BotoExceptionMatcher()
     # InsufficientInstanceCapacity can be both server and client error
@@ -21,6 +21,7 @@ import time
 import boto.exception
 from testtools import TestCase
 
+from tempest.common import waiters
 import tempest.config
 from tempest.openstack.common import log as logging
 
@@ -40,64 +41,64 @@ def state_wait(lfunction, final_set=set(), valid_set=None):
     if not isinstance(valid_set, set) and valid_set is not None:
         valid_set = set((valid_set,))
     start_time = time.time()
-    old_status = status = lfunction()
-    while True:
-        if status != old_status:
-            LOG.info('State transition "%s" ==> "%s" %d second', old_status,
-                     status, time.time() - start_time)
-        if status in final_set:
-            return status
-        if valid_set is not None and status not in valid_set:
-            return status
-        dtime = time.time() - start_time
-        if dtime > default_timeout:
-            raise TestCase.failureException("State change timeout exceeded!"
-                                            '(%ds) While waiting'
-                                            'for %s at "%s"' %
-                                            (dtime,
-                                            final_set, status))
-        time.sleep(default_check_interval)
-        old_status = status
+    statuses = []
+
+    def get_status():
         status = lfunction()
+        if statuses and status != statuses[-1]:
+            LOG.info('State transition "%s" ==> "%s" %d second',
+                     statuses[-1], status, time.time() - start_time)
+        statuses.append(status)
+        return status
+
+    def is_final(status):
+        return (status in final_set or
+                valid_set is not None and status not in valid_set)
+
+    resource_type = 'ec2 ' + ','.join(sorted(str(s) for s in final_set))
+    waiter = waiters.Waiter(default_timeout, default_check_interval,
+                            resource_type)
+    if not waiter.wait(get_status, is_final):
+        raise TestCase.failureException("State change timeout exceeded!"
+                                        '(%ds) While waiting'
+                                        'for %s at "%s"' %
+                                        (waiter.elapsed,
+                                        final_set, waiter.value))
+    return waiter.value
 
 
 def re_search_wait(lfunction, regexp):
     """Stops waiting on success."""
-    start_time = time.time()
-    while True:
+    def search():
         text = lfunction()
-        result = re.search(regexp, text)
-        if result is not None:
-            LOG.info('Pattern "%s" found in %d second in "%s"',
-                     regexp,
-                     time.time() - start_time,
-                     text)
-            return result
-        dtime = time.time() - start_time
-        if dtime > default_timeout:
-            raise TestCase.failureException('Pattern find timeout exceeded!'
-                                            '(%ds) While waiting for'
-                                            '"%s" pattern in "%s"' %
-                                            (dtime,
-                                            regexp, text))
-        time.sleep(default_check_interval)
+        return text, re.search(regexp, text)
+
+    waiter = waiters.Waiter(default_timeout, default_check_interval)
+    if not waiter.wait(search, lambda r: r[1] is not None):
+        raise TestCase.failureException('Pattern find timeout exceeded!'
+                                        '(%ds) While waiting for'
+                                        '"%s" pattern in "%s"' %
+                                        (waiter.elapsed,
+                                        regexp, waiter.value[0]))
+    text, result = waiter.value
+    LOG.info('Pattern "%s" found in %d second in "%s"',
+             regexp,
+             waiter.elapsed,
+             text)
+    return result
 
 
 def wait_no_exception(lfunction, exc_class=None, exc_matcher=None):
     """Stops waiting on success."""
-    start_time = time.time()
     if exc_matcher is not None:
         exc_class = boto.exception.BotoServerError
 
     if exc_class is None:
         exc_class = BaseException
-    while True:
-        result = None
+
+    def call():
         try:
-            result = lfunction()
-            LOG.info('No Exception in %d second',
-                     time.time() - start_time)
-            return result
+            return True, lfunction()
         except exc_class as exc:
             if exc_matcher is not None:
                 res = exc_matcher.match(exc)
@@ -105,28 +106,29 @@ def wait_no_exception(lfunction, exc_class=None, exc_matcher=None):
                     LOG.info(res)
                     raise exc
         # Let the other exceptions propagate
-        dtime = time.time() - start_time
-        if dtime > default_timeout:
-            raise TestCase.failureException("Wait timeout exceeded! (%ds)" %
-                                            dtime)
-        time.sleep(default_check_interval)
+        return False, None
+
+    waiter = waiters.Waiter(default_timeout, default_check_interval)
+    if not waiter.wait(call, lambda r: r[0]):
+        raise TestCase.failureException("Wait timeout exceeded! (%ds)" %
+                                        waiter.elapsed)
+    LOG.info('No Exception in %d second', waiter.elapsed)
+    return waiter.value[1]
 
 
 # NOTE(afazekas): EC2/boto normally raise exception instead of empty list
 def wait_exception(lfunction):
     """Returns with the exception or raises one."""
-    start_time = time.time()
-    while True:
+    def call():
         try:
             lfunction()
         except BaseException as exc:
-            LOG.info('Exception in %d second',
-                     time.time() - start_time)
             return exc
-        dtime = time.time() - start_time
-        if dtime > default_timeout:
-            raise TestCase.failureException("Wait timeout exceeded! (%ds)" %
-                                            dtime)
-        time.sleep(default_check_interval)
-
-# TODO(afazekas): consider strategy design pattern..
+        return None
+
+    waiter = waiters.Waiter(default_timeout, default_check_interval)
+    if not waiter.wait(call, lambda exc: exc is not None):
+        raise TestCase.failureException("Wait timeout exceeded! (%ds)" %
+                                        waiter.elapsed)
+    LOG.info('Exception in %d second', waiter.elapsed)
+    return waiter.value